@@ -0,0 +1,118 @@
+"""
+Compares the indexed back resolution with the former linear scans over all
+sheets and ID lists on a synthetic card pool of full-collection size.
+
+Usage: py benchmarks/bench_back_resolution.py [card count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import TTSBundleProcessor
+
+
+def linear_resolve_back_url(proc, arkham_id, data):
+    """The former implementation, kept as the baseline."""
+    translated_data = proc.get_translated_data(arkham_id)
+    if data.get("double_sided"):
+        back_id = f"{arkham_id}{proc.BACK_SUFFIX}"
+        for s_param in proc.sheet_parameters.values():
+            if s_param["sheet_type"] == "back" and back_id in s_param["id_list"]:
+                return s_param.get("uploaded_url", proc.BACK_URLS["Player"])
+
+    if arkham_id.endswith("-c"):
+        return proc.BACK_URLS["Upgradesheet"]
+    if arkham_id.startswith("HC"):
+        return proc.BACK_URLS["Concealed"]
+    if arkham_id.startswith("TAR"):
+        return proc.BACK_URLS["Tarot"]
+
+    for special_type, id_list in proc.SPECIAL_ID_MAPS.items():
+        if arkham_id in id_list:
+            return proc.BACK_URLS[special_type]
+
+    if "deck_limit" in translated_data:
+        return proc.BACK_URLS["Player"]
+    if "encounter_code" in translated_data:
+        return proc.BACK_URLS["Encounter"]
+    return proc.BACK_URLS["Player"]
+
+
+def make_processor(card_count, tmp):
+    proc = TTSBundleProcessor(
+        {
+            "locale": "de",
+            "cloud_name": "-",
+            "api_key": "-",
+            "api_secret": "-",
+            "upload": False,
+            "img_count_per_sheet": 30,
+            "img_max_kb": 20_480,
+            "sheet_cache_mb": 0,
+            "card_cache_mb": 0,
+            # Keep everything in the benchmark folder
+            "temp_folder": os.path.join(tmp, "temp"),
+            "cache_folder": os.path.join(tmp, "cache"),
+        }
+    )
+
+    # Every fifth card is double-sided, spread over cycles of 300 cards
+    for n in range(card_count):
+        arkham_id = f"{(n // 300) + 1:02}{n % 300 + 1:03}"
+        double_sided = n % 5 == 0
+        category = "PlayerCards" if n % 2 else "EncounterCards"
+        entry = {
+            "cycle_name": arkham_id[:2],
+            "file_path": f"{arkham_id}.webp",
+            "double_sided": double_sided,
+            "category": category,
+        }
+        proc.card_index[arkham_id] = entry
+        if double_sided:
+            proc.card_index[f"{arkham_id}{proc.BACK_SUFFIX}"] = dict(entry)
+
+    return proc
+
+
+def time_resolution(proc, resolve):
+    start = time.perf_counter()
+    for arkham_id, data in proc.card_index.items():
+        resolve(arkham_id, data)
+    return time.perf_counter() - start
+
+
+def main():
+    card_count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = make_processor(card_count, tmp)
+
+        start = time.perf_counter()
+        proc.organize_sheets()
+        organize_time = time.perf_counter() - start
+
+        indexed = time_resolution(proc, proc.resolve_back_url)
+        linear = time_resolution(
+            proc, lambda *args: linear_resolve_back_url(proc, *args)
+        )
+
+        # Both must agree on every card
+        for arkham_id, data in proc.card_index.items():
+            assert proc.resolve_back_url(arkham_id, data) == linear_resolve_back_url(
+                proc, arkham_id, data
+            ), arkham_id
+
+        print(f"Cards:           {len(proc.card_index)}")
+        print(f"Sheets:          {len(proc.sheet_parameters)}")
+        print(f"organize_sheets: {organize_time * 1000:.1f} ms")
+        print(f"Linear lookup:   {linear * 1000:.1f} ms")
+        print(
+            f"Indexed lookup:  {indexed * 1000:.1f} ms ({linear / indexed:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Compares writing the bag with the streaming writer (indented and compact,
+with and without orjson) against the former deep copies and json.dump, for
+a synthetic bag with parallel and Taboo versions.
+
+Usage: py benchmarks/bench_bag.py [card count] [repeats]
+"""
+
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import TTSBundleProcessor
+from modules import bag_writer, tts_templates
+
+CATEGORIES = ["EncounterCards", "PlayerCards", "Tarot"]
+
+
+def make_processor(count, output_folder):
+    proc = TTSBundleProcessor(
+        {
+            "locale": "de",
+            "upload": False,
+            "output_folder": output_folder,
+            "sheet_cache_mb": 0,
+            "card_cache_mb": 0,
+            # Keep everything in the benchmark folder
+            "temp_folder": os.path.join(output_folder, "temp"),
+            "cache_folder": os.path.join(output_folder, "cache"),
+        }
+    )
+    for i in range(count):
+        arkham_id = f"{i // 300 + 1:02}{i % 300:03}" + ["", "-t", "-pf"][i % 3]
+        deck_id = i // 30 + 1
+        proc.card_index[arkham_id] = {
+            "deck_id": deck_id,
+            "card_id": i % 30,
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "cycle_name": f"{i // 500:02} - Cycle",
+            "double_sided": False,
+        }
+        proc.sheet_parameters.setdefault(
+            deck_id,
+            {
+                "sheet_type": "single",
+                "back_url": proc.BACK_URLS["Player"],
+                "uploaded_url": f"https://res.cloudinary.com/x/image/upload/v1/Sheet_{deck_id}.webp",
+                "grid_size": (3, 10),
+            },
+        )
+        proc.translation_data[arkham_id.split("-")[0]] = {
+            "name": f"Karte {i}",
+            "subname": "Übersetzt",
+            "xp": i % 4,
+            "type_code": "investigator" if i % 50 == 0 else "asset",
+        }
+    return proc
+
+
+def former_build(proc, path):
+    """The former implementation, kept as the baseline."""
+    bags = {}
+    for arkham_id, data in proc.card_index.items():
+        sheet_info = proc.sheet_parameters[data["deck_id"]]
+        translated_data = proc.get_translated_data(arkham_id)
+        card = copy.deepcopy(tts_templates.CARD)
+        card["GMNotes"] = '{"id":"' + arkham_id + '"}'
+        card["GUID"] = f"de_{arkham_id}"
+        name_suffix = ""
+        if translated_data.get("xp", 0) > 0:
+            name_suffix += f" ({translated_data['xp']})"
+        for suffix, label in proc.SUFFIX_MAP.items():
+            if arkham_id.endswith(suffix):
+                name_suffix += f" {label}"
+                break
+        card["Nickname"] = translated_data.get("name", arkham_id) + name_suffix
+        card["Description"] = translated_data.get("subname", "")
+        if translated_data.get("type_code") in {"investigator", "act", "agenda"}:
+            card["SidewaysCard"] = True
+        deck_id = data["deck_id"] + proc.deck_offset
+        card["CardID"] = f"{deck_id}{data['card_id']:02}"
+        card["CustomDeck"] = {
+            str(deck_id): {
+                "FaceURL": sheet_info["uploaded_url"],
+                "BackURL": sheet_info["back_url"],
+                "NumWidth": sheet_info["grid_size"][1],
+                "NumHeight": sheet_info["grid_size"][0],
+                "BackIsHidden": True,
+                "UniqueBack": data["double_sided"],
+                "Type": 0,
+            }
+        }
+        bags.setdefault(data["category"], {}).setdefault(data["cycle_name"], []).append(
+            card
+        )
+
+    category_bags = []
+    for category in sorted(bags):
+        category_bag = copy.deepcopy(tts_templates.BAG)
+        category_bag["Nickname"] = category
+        category_bag["GUID"] = f"de_bag_{category}"
+        category_bag["ContainedObjects"] = []
+        for cycle_name in sorted(bags[category]):
+            cycle_bag = copy.deepcopy(tts_templates.BAG)
+            cycle_bag["Nickname"] = cycle_name
+            cycle_bag["GUID"] = f"de_bag_{category}_{cycle_name}".replace(" ", "")
+            cycle_bag["ContainedObjects"] = bags[category][cycle_name]
+            category_bag["ContainedObjects"].append(cycle_bag)
+        category_bags.append(category_bag)
+
+    master_bag = copy.deepcopy(tts_templates.BAG)
+    master_bag["Nickname"] = "DE"
+    master_bag["GUID"] = "de_bag"
+    master_bag["ContainedObjects"] = category_bags
+    saved_object = copy.deepcopy(tts_templates.SAVED_OBJECT)
+    saved_object["ObjectStates"] = [master_bag]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(saved_object, f, ensure_ascii=False, indent=2)
+
+
+def time_build(build, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        build()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = make_processor(count, tmp)
+        former_path = os.path.join(tmp, "former.json")
+        former_time = time_build(lambda: former_build(proc, former_path), repeats)
+        former_size = os.path.getsize(former_path)
+        print(f"{count} cards")
+        print(
+            f"{'former':<22}{former_time * 1000:>7.0f} ms {former_size / 1024:>7.0f} KB"
+        )
+
+        orjson = bag_writer.orjson
+        for encoder in ("orjson", "json"):
+            if encoder == "json":
+                bag_writer.orjson = None
+            elif orjson is None:
+                print("orjson:               not installed")
+                continue
+
+            for compact in (False, True):
+                proc.cfg["compact_json"] = compact
+                build_time = time_build(proc.build_tts_json, repeats)
+                path = next(
+                    entry.path
+                    for entry in os.scandir(tmp)
+                    if entry.name.endswith(" - DE.json")
+                )
+                size = os.path.getsize(path)
+                name = f"{encoder}{', compact' if compact else ''}"
+                print(
+                    f"{name:<22}{build_time * 1000:>7.0f} ms {size / 1024:>7.0f} KB "
+                    f"({former_time / build_time:.1f}x faster, "
+                    f"{size / former_size:.0%} of the size)"
+                )
+        bag_writer.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compares the one-pass contrast adjustment with the former autocontrast and
+contrast enhancement passes on synthetic cards, with and without NumPy.
+
+Usage: py benchmarks/bench_contrast.py [card count] [contrast in %]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageEnhance, ImageOps
+
+from main import TTSBundleProcessor
+from modules import imaging
+
+CARD_SIZE = TTSBundleProcessor.CARD_SIZES["Regular"]
+
+
+def former_adjust_contrast(img, factor):
+    """The former implementation, kept as the baseline."""
+    img = ImageOps.autocontrast(img, cutoff=1)
+    return ImageEnhance.Contrast(img).enhance(factor)
+
+
+def make_cards(count):
+    """Low-contrast cards with different brightness."""
+    cards = []
+    for i in range(count):
+        gradient = Image.linear_gradient("L").resize(CARD_SIZE)
+        bands = [
+            gradient.point(lambda v, k=k: 60 + (v * (100 + 10 * k + i)) // 400)
+            for k in range(3)
+        ]
+        cards.append(Image.merge("RGB", bands).effect_spread(3))
+    return cards
+
+
+def time_adjust(adjust, cards, factor):
+    start = time.perf_counter()
+    results = [adjust(card, factor) for card in cards]
+    return (time.perf_counter() - start) / len(cards), results
+
+
+def max_difference(results, reference):
+    return max(
+        high
+        for a, b in zip(results, reference)
+        for _, high in ImageChops.difference(a, b).getextrema()
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    factor = (int(sys.argv[2]) if len(sys.argv) > 2 else 150) / 100
+    cards = make_cards(count)
+
+    former_time, reference = time_adjust(former_adjust_contrast, cards, factor)
+    print(
+        f"Cards:         {count} x {CARD_SIZE[0]}x{CARD_SIZE[1]}, contrast {factor:.0%}"
+    )
+    print(f"Former:        {former_time * 1000:.1f} ms per card")
+
+    numpy = imaging.np
+    for name in ("NumPy", "plain Python"):
+        if name == "plain Python":
+            imaging.np = None
+        elif numpy is None:
+            print("NumPy:         not installed")
+            continue
+
+        one_pass_time, results = time_adjust(imaging.adjust_contrast, cards, factor)
+        print(
+            f"{name + ':':<15}{one_pass_time * 1000:.1f} ms per card "
+            f"({former_time / one_pass_time:.1f}x faster), "
+            f"max difference {max_difference(results, reference)}"
+        )
+    imaging.np = numpy
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares one existence request per file with the paginated listing of the
+RemoteIndex against a stand-in for Cloudinary, and checks that the index
+finds every file, is persisted, records uploads and falls back to its
+manifest when the listing fails.
+
+Usage: py benchmarks/bench_remote_index.py [file count] [page size] [latency ms]
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import FakeCloudinary
+from modules.remote_index import RemoteIndex
+
+
+def per_file_exists(cloud, names):
+    """The former existence check, one request per file, kept as the baseline."""
+    urls = {}
+    for name in names:
+        time.sleep(cloud.latency)
+        url = cloud.resources.get(name)
+        if url:
+            urls[name] = url
+    return urls
+
+
+def failing_list_page(folder, cursor=None):
+    raise ConnectionError("listing is down")
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    latency = (int(sys.argv[3]) if len(sys.argv) > 3 else 5) / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cloud = FakeCloudinary(os.path.join(tmp, "cloud"), latency, page_size)
+        for n in range(file_count):
+            cloud.resources[f"Sheet_DE_{n:05}"] = f"https://res.example/{n}.webp"
+        names = list(cloud.resources) + ["Sheet_DE_missing"]
+
+        start = time.perf_counter()
+        expected = per_file_exists(cloud, names)
+        per_file = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cloud.load()
+        found = cloud.exists(names)
+        listing = time.perf_counter() - start
+
+        # Every file is found with its URL in one request per page
+        assert found == expected
+        assert cloud.url("Sheet_DE_missing") is None
+        assert cloud.list_requests == max(math.ceil(file_count / page_size), 1)
+
+        # The persisted manifest is reused without listing again
+        path, folder = cloud.remote_index.path, cloud.remote_index.folder
+        cached = RemoteIndex(path, folder, failing_list_page)
+        cached.load(max_age=3600)
+        assert cached.urls == cloud.remote_index.urls
+
+        # Uploads are recorded in the manifest
+        cloud.remote_index.add("Sheet_DE_added", "https://res.example/added.webp")
+        cached = RemoteIndex(path, folder, failing_list_page)
+        cached.load(max_age=3600)
+        assert cached.get("Sheet_DE_added") == "https://res.example/added.webp"
+
+        # A failed listing falls back to the manifest, other folders don't use it
+        fallback = RemoteIndex(path, folder, failing_list_page)
+        fallback.load()
+        assert fallback.urls == cached.urls
+        try:
+            RemoteIndex(path, "Other", failing_list_page).load()
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("manifest of another folder was used")
+
+    print(f"Files:           {file_count} ({cloud.list_requests} pages)")
+    print(f"Per-file checks: {per_file * 1000:.0f} ms")
+    print(
+        f"Listing:         {listing * 1000:.0f} ms ({per_file / listing:.0f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares the decode-and-resize time per card of the resize tiers with the
+former full-size pipeline, and their output against it (PSNR in dB, higher is
+closer; identical images show "inf").
+
+Synthetic scans at 4x the card size are used, in portrait and landscape and in
+every supported format.
+
+Usage: py benchmarks/bench_resize.py [scale of the scans] [repeats]
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageStat
+
+from main import TTSBundleProcessor
+from modules import imaging
+
+CARD_SIZE = TTSBundleProcessor.CARD_SIZES["Regular"]
+
+
+def make_scan(path, size):
+    """Writes an image with gradients, fine lines and text-like detail."""
+    w, h = size
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    img = Image.merge(
+        "RGB",
+        (img.getchannel(0), img.getchannel(0).rotate(90), Image.new("L", size, 90)),
+    )
+    draw = ImageDraw.Draw(img)
+    for i in range(0, w, max(w // 60, 1)):
+        draw.line([(i, 0), (w - i, h)], fill=(20, 20, 20), width=2)
+    for y in range(h // 2, h - 40, 40):
+        for x in range(40, w - 40, 30):
+            draw.rectangle([x, y, x + 18, y + 22], outline=(0, 0, 0))
+    img = img.filter(ImageFilter.GaussianBlur(1))
+    img.save(path, quality=92) if path.endswith(".jpg") else img.save(path)
+
+
+def former_load_card(path, size):
+    """The former pipeline, kept as the baseline and quality reference."""
+    with Image.open(path) as img:
+        if img.size[0] > img.size[1]:
+            img = img.rotate(-90, expand=True)
+        return img.resize(size, Image.Resampling.LANCZOS).convert("RGB")
+
+
+def psnr(a, b):
+    diff = ImageChops.difference(a, b)
+    mse = sum(v**2 for v in ImageStat.Stat(diff).rms) / 3
+    return math.inf if mse == 0 else 10 * math.log10(255**2 / mse)
+
+
+def time_load(load, path, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        img = load(path)
+    return (time.perf_counter() - start) / repeats, img
+
+
+def main():
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    scan_size = (int(CARD_SIZE[0] * scale), int(CARD_SIZE[1] * scale))
+
+    print(f"Scans of {scan_size[0]}x{scan_size[1]} to {CARD_SIZE[0]}x{CARD_SIZE[1]}")
+    print(
+        f"{'file':<16}{'former':>10}"
+        + "".join(f"{t:>20}" for t in imaging.RESIZE_TIERS)
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in (".jpg", ".webp", ".png"):
+            for orientation, size in [
+                ("portrait", scan_size),
+                ("landscape", scan_size[::-1]),
+            ]:
+                path = os.path.join(tmp, f"{orientation}{ext}")
+                make_scan(path, size)
+
+                former_time, reference = time_load(
+                    lambda p: former_load_card(p, CARD_SIZE), path, repeats
+                )
+                line = f"{orientation + ext:<16}{former_time * 1000:>8.0f}ms"
+                for tier in imaging.RESIZE_TIERS:
+                    tier_time, img = time_load(
+                        lambda p: imaging.load_card(p, CARD_SIZE, tier=tier),
+                        path,
+                        repeats,
+                    )
+                    line += (
+                        f"{tier_time * 1000:>7.0f}ms {former_time / tier_time:>4.1f}x"
+                        f"{psnr(img, reference):>5.0f}dB"
+                    )
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
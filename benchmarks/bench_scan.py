@@ -0,0 +1,167 @@
+"""
+Compares the parallel scanner and the file list input with the former
+os.walk scan on a synthetic source tree (empty files, 50k by default).
+
+A network share is simulated by delaying every folder listing.
+
+Usage: py benchmarks/bench_scan.py [file count] [latency per folder in ms] [tree folder]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import TTSBundleProcessor
+
+
+def make_tree(path, file_count):
+    """Creates cycles of 500 cards with every fifth card double-sided."""
+    files = []
+    n = 0
+    while len(files) < file_count:
+        category = ["PlayerCards", "EncounterCards"][n % 2]
+        cycle = f"{(n // 500) % 99 + 1:02}"
+        arkham_id = f"{cycle}{n % 500 + 1:03}"
+        files.append(os.path.join(category, cycle, f"{arkham_id}.webp"))
+        if n % 5 == 0:
+            files.append(os.path.join(category, cycle, f"{arkham_id}-back.webp"))
+        n += 1
+
+    # Files that are not scanned
+    files += [os.path.join("Backs", f"{i}.jpg") for i in range(50)]
+    files += [os.path.join("Other", str(i // 100), f"{i}.webp") for i in range(500)]
+
+    for file in files:
+        full_path = os.path.join(path, file)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        open(full_path, "wb").close()
+
+
+def walk_scan(proc):
+    """The former directory walk, kept as the baseline."""
+    folders = []
+    for root, _, files in os.walk(proc.cfg["source_folder"]):
+        path_parts = root.split(os.sep)
+        folder_category = next((f for f in proc.WHITELIST if f in path_parts), None)
+        if not folder_category:
+            continue
+
+        category_index = path_parts.index(folder_category)
+        folder_cycle_name = None
+        if category_index + 1 < len(path_parts):
+            folder_cycle_name = path_parts[category_index + 1]
+
+        files = [
+            file
+            for file in files
+            if file.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))
+        ]
+        folders.append((folder_category, folder_cycle_name, root, files))
+    return folders
+
+
+def simulate_latency(latency):
+    """Delays every os.scandir call (also the ones of os.walk) by latency seconds."""
+    scandir = os.scandir
+
+    def slow_scandir(*args):
+        time.sleep(latency)
+        return scandir(*args)
+
+    os.scandir = slow_scandir
+
+
+def make_processor(tmp, source_folder, file_list=""):
+    return TTSBundleProcessor(
+        {
+            "locale": "de",
+            "cloud_name": "-",
+            "api_key": "-",
+            "api_secret": "-",
+            "upload": False,
+            "source_folder": source_folder,
+            "source_file_list": file_list,
+            "sheet_cache_mb": 0,
+            "card_cache_mb": 0,
+            # Keep everything in the benchmark folder
+            "temp_folder": os.path.join(tmp, "temp"),
+            "cache_folder": os.path.join(tmp, "cache"),
+        }
+    )
+
+
+def time_scan(proc):
+    start = time.perf_counter()
+    proc.scan_source()
+    return time.perf_counter() - start
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file_count", nargs="?", type=int, default=50_000)
+    parser.add_argument(
+        "latency_ms",
+        nargs="?",
+        type=float,
+        default=5.0,
+        help="delay of every folder listing in ms",
+    )
+    parser.add_argument(
+        "tree", nargs="?", help="existing source tree (default: a synthetic one)"
+    )
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    file_count, latency_ms = args.file_count, args.latency_ms
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = args.tree or os.path.join(tmp, "tree")
+        if not os.path.isdir(tree):
+            make_tree(tree, file_count)
+        simulate_latency(latency_ms / 1000)
+
+        # The former scan: os.walk with the same per-file indexing
+        from modules import scanner
+
+        baseline = make_processor(tmp, tree)
+        scan_tree = scanner.scan_tree
+        scanner.scan_tree = lambda *args: walk_scan(baseline)
+        try:
+            walk_time = time_scan(baseline)
+        finally:
+            scanner.scan_tree = scan_tree
+
+        parallel = make_processor(tmp, tree)
+        parallel_time = time_scan(parallel)
+
+        file_list = os.path.join(tmp, "files.txt")
+        with open(file_list, "w", encoding="utf-8") as f:
+            f.write("\n".join(parallel.scanned_files))
+        listed = make_processor(tmp, tree, file_list)
+        list_time = time_scan(listed)
+
+    # All must produce the same index in the same order
+    for proc in (parallel, listed):
+        assert list(proc.card_index.items()) == list(baseline.card_index.items())
+
+    print(f"Files:          {len(parallel.scanned_files)}")
+    print(f"Latency:        {latency_ms:g} ms per folder")
+    print(f"Cards:          {len(parallel.card_index)}")
+    print(f"os.walk scan:   {walk_time * 1000:.0f} ms")
+    print(
+        f"Parallel scan:  {parallel_time * 1000:.0f} ms "
+        f"({walk_time / parallel_time:.1f}x faster)"
+    )
+    print(
+        f"File list:      {list_time * 1000:.0f} ms "
+        f"({walk_time / list_time:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
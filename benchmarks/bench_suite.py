@@ -0,0 +1,224 @@
+"""
+Times the steps of a full build on a synthetic source tree, with local
+stand-ins for arkham.build and (with --upload) Cloudinary, and writes the
+results as JSON, so runs of different versions can be compared.
+
+Usage: py benchmarks/bench_suite.py [--cycles N] [--upload] [--output results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from fixtures import CardDataServer, FakeCloudinary, SourceTree
+from main import TTSBundleProcessor
+from modules.settings import DEFAULTS
+
+STEPS = [
+    "load_card_data",
+    "scan_source",
+    "preflight_check",
+    "handle_local_backs",
+    "organize_sheets",
+    "process_images",
+    "build_tts_json",
+]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--cards-per-cycle", type=int, default=60)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="size of the source images relative to the card size (x1 to x2 of it)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--upload", action="store_true", help="upload to the stand-in")
+    parser.add_argument("--upload-latency-ms", type=float, default=50)
+    parser.add_argument("--api-latency-ms", type=float, default=20)
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="keep the caches between repeats (measures rebuilds)",
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="override a setting, e.g. --set img_quality=85 (JSON values)",
+    )
+    parser.add_argument("--output", help="JSON file for the results (default: stdout)")
+    parser.add_argument("--verbose", action="store_true", help="show the build output")
+    return parser
+
+
+def get_config(args, tmp):
+    cfg = {
+        **DEFAULTS,
+        "locale": "de",
+        "source_folder": os.path.join(tmp, "source"),
+        "output_folder": os.path.join(tmp, "output"),
+        "upload": False,
+        "reset_temp": True,
+        "max_sheet_count": 9999,
+        "incremental": False,
+        # Keep everything in the benchmark folder
+        "temp_folder": os.path.join(tmp, "temp"),
+        "cache_folder": os.path.join(tmp, "cache"),
+    }
+    if not args.warm:
+        cfg["sheet_cache_mb"] = 0
+        cfg["card_cache_mb"] = 0
+
+    for setting in args.set:
+        key, _, value = setting.partition("=")
+        try:
+            cfg[key] = json.loads(value)
+        except json.JSONDecodeError:
+            cfg[key] = value
+    return cfg
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_save_with_retry(proc):
+    """Sums the time of all save_with_retry calls (they overlap in the pipeline)."""
+    stats = {"calls": 0, "seconds": 0.0}
+    lock = threading.Lock()
+    save_with_retry = proc.save_with_retry
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return save_with_retry(*args, **kwargs)
+        finally:
+            with lock:
+                stats["calls"] += 1
+                stats["seconds"] += time.perf_counter() - start
+
+    proc.save_with_retry = timed
+    return stats
+
+
+def run_build(cfg, api_url, cloud):
+    """Runs one build step by step and returns the timings."""
+    proc = TTSBundleProcessor({**cfg, "api_url": api_url})
+    if cloud:
+        cloud.attach(proc)
+    save_stats = time_save_with_retry(proc)
+
+    timings = {}
+    proc.ensure_temp_path()
+    for step in STEPS:
+        if step == "handle_local_backs" and proc.cfg["upload"]:
+            proc.load_remote_index()
+        start = time.perf_counter()
+        getattr(proc, step)()
+        timings[step] = time.perf_counter() - start
+    timings["total"] = sum(timings.values())
+
+    return {
+        "timings": timings,
+        "save_with_retry": save_stats,
+        "cards": len(proc.card_index),
+        "sheets": len(proc.sheet_parameters),
+        "sheet_bytes": sum(
+            entry.stat().st_size
+            for entry in os.scandir(proc.temp_path)
+            if entry.name.startswith("Sheet_")
+        ),
+    }
+
+
+def main():
+    args = build_parser().parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg = get_config(args, tmp)
+        os.makedirs(cfg["output_folder"])
+
+        start = time.perf_counter()
+        tree = SourceTree(
+            cfg["source_folder"],
+            args.cycles,
+            args.cards_per_cycle,
+            args.scale,
+            args.seed,
+        ).create()
+        tree_seconds = time.perf_counter() - start
+
+        cloud = None
+        if args.upload:
+            cloud = FakeCloudinary(
+                os.path.join(tmp, "cloud"), args.upload_latency_ms / 1000
+            )
+
+        runs = []
+        with CardDataServer(tree.cards, args.api_latency_ms / 1000) as api:
+            for _ in range(args.repeat):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                    runs.append(run_build(cfg, api.base_url, cloud))
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "tree": {
+            "files": tree.file_count,
+            "cards": runs[0]["cards"],
+            "sheets": runs[0]["sheets"],
+            "seconds": tree_seconds,
+        },
+        "runs": runs,
+        "best": {
+            step: min(run["timings"][step] for run in runs)
+            for step in STEPS + ["total"]
+        },
+    }
+    if cloud:
+        results["uploaded_bytes"] = cloud.uploaded_bytes
+        results["list_requests"] = cloud.list_requests
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        for step, seconds in results["best"].items():
+            print(f"{step:<20}{seconds * 1000:>10.0f} ms")
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
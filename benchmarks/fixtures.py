@@ -0,0 +1,250 @@
+"""
+Synthetic source trees and local stand-ins for arkham.build and Cloudinary,
+so builds can be measured without the real card images or network access.
+"""
+
+import hashlib
+import http.server
+import json
+import os
+import random
+import shutil
+import threading
+import time
+
+from PIL import Image, ImageDraw
+
+from modules.remote_index import RemoteIndex
+from modules.storage import Storage
+from modules.uploader import Uploader
+
+CARD_SIZE = (750, 1050)
+TAROT_SIZE = (800, 1400)
+FORMATS = [".jpg", ".webp", ".png"]
+
+
+def _card_image(rng, size, landscape=False):
+    """A card-like image: colored frame, an 'art' box of circles and lines of 'text'."""
+    w, h = size
+    img = Image.new("RGB", size, tuple(rng.randrange(60, 200) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(
+        [w // 12, h // 10, w - w // 12, h // 2],
+        fill=tuple(rng.randrange(256) for _ in range(3)),
+    )
+    for _ in range(40):
+        x, y = rng.randrange(w // 12, w - w // 12), rng.randrange(h // 10, h // 2)
+        r = rng.randrange(5, w // 8)
+        draw.ellipse(
+            [x - r, y - r, x + r, y + r],
+            fill=tuple(rng.randrange(256) for _ in range(3)),
+        )
+    for y in range(h // 2 + h // 20, h - h // 10, max(h // 40, 4)):
+        draw.line([(w // 10, y), (w - w // 10 - rng.randrange(w // 3), y)], fill=0)
+    return img.rotate(90, expand=True) if landscape else img
+
+
+class SourceTree:
+    """
+    Writes a source tree in the layout of the README: numbered cycle folders
+    below EncounterCards and PlayerCards, '-back' files, parallel 90xxx
+    investigators, Taboo versions, Tarot cards and a local back in Backs.
+    Images come in mixed formats and sizes (scale to scale * 2 of the card
+    size). The matching card data is in self.cards.
+    """
+
+    def __init__(self, path, cycles=3, cards_per_cycle=60, scale=1.0, seed=1):
+        self.path = path
+        self.cycles = cycles
+        self.cards_per_cycle = cards_per_cycle
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.cards = []
+        self.file_count = 0
+
+    def _write(self, rel_path, size, landscape=False):
+        factor = self.scale * (1 + self.rng.random())
+        size = (int(size[0] * factor), int(size[1] * factor))
+        path = os.path.join(self.path, rel_path + self.rng.choice(FORMATS))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        img = _card_image(self.rng, size, landscape)
+        img.save(path, quality=90) if path.endswith(".jpg") else img.save(path)
+        self.file_count += 1
+
+    def _card(self, arkham_id, **fields):
+        self.cards.append({"id": arkham_id, "name": f"Card {arkham_id}", **fields})
+
+    def create(self):
+        for cycle in range(1, self.cycles + 1):
+            cycle_id = f"{cycle:02}"
+            encounter_folder = os.path.join("EncounterCards", f"{cycle_id} - Cycle")
+            player_folder = os.path.join("PlayerCards", f"{cycle_id} - Cycle")
+
+            # Investigators are double-sided and get a parallel version
+            for n in range(1, 4):
+                arkham_id = f"{cycle_id}{n:03}"
+                self._card(arkham_id, type_code="investigator", deck_limit=1)
+                self._write(os.path.join(player_folder, arkham_id), CARD_SIZE, True)
+                self._write(
+                    os.path.join(player_folder, f"{arkham_id}-back"), CARD_SIZE, True
+                )
+
+                parallel_id = f"90{cycle:01}{n:02}"
+                self._card(
+                    parallel_id,
+                    type_code="investigator",
+                    deck_limit=1,
+                    alternate_of_code=arkham_id,
+                )
+                for suffix in ("", "-back"):
+                    self._write(
+                        os.path.join("PlayerCards", "Parallel", parallel_id + suffix),
+                        CARD_SIZE,
+                        True,
+                    )
+
+            # Player cards, some with XP and a Taboo version
+            for n in range(4, self.cards_per_cycle // 2):
+                arkham_id = f"{cycle_id}{n:03}"
+                self._card(arkham_id, deck_limit=2, xp=n % 4)
+                self._write(os.path.join(player_folder, arkham_id), CARD_SIZE)
+                if n % 10 == 0:
+                    self._write(
+                        os.path.join("PlayerCards", "Taboo", f"{arkham_id}-t"),
+                        CARD_SIZE,
+                    )
+
+            # Encounter cards, acts and agendas are sideways and double-sided
+            for n in range(100, 100 + self.cards_per_cycle // 2):
+                arkham_id = f"{cycle_id}{n:03}"
+                if n < 104:
+                    self._card(arkham_id, type_code="act", encounter_code="story")
+                    self._write(
+                        os.path.join(encounter_folder, arkham_id), CARD_SIZE, True
+                    )
+                    self._write(
+                        os.path.join(encounter_folder, f"{arkham_id}-back"),
+                        CARD_SIZE,
+                        True,
+                    )
+                else:
+                    self._card(arkham_id, encounter_code="set", subname="Subtitle")
+                    self._write(os.path.join(encounter_folder, arkham_id), CARD_SIZE)
+
+        # Cards with the Arkham Woods back and a local version of it
+        for n in range(150, 156):
+            self._card(f"01{n}", encounter_code="woods")
+            self._write(
+                os.path.join("EncounterCards", "01 - Cycle", f"01{n}"), CARD_SIZE
+            )
+        self._write(os.path.join("Backs", "ArkhamWoods"), CARD_SIZE)
+
+        for n in range(22):
+            self._write(os.path.join("Tarot", f"TAR{n:02}"), TAROT_SIZE)
+
+        return self
+
+
+class CardDataServer:
+    """
+    Serves card data like arkham.build on localhost, with ETags.
+    Use base_url as "api_url": payloads are served at <base_url>/<locale>.
+    """
+
+    def __init__(self, cards, latency=0.0):
+        self.payload = json.dumps({"data": {"all_card": cards}}).encode()
+        self.etag = '"' + hashlib.sha256(self.payload).hexdigest()[:32] + '"'
+        self.latency = latency
+        self.server = None
+
+    def __enter__(self):
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(stand_in.latency)
+                if self.headers.get("If-None-Match") == stand_in.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("ETag", stand_in.etag)
+                self.send_header("Content-Length", str(len(stand_in.payload)))
+                self.end_headers()
+                self.wfile.write(stand_in.payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+class FakeCloudinary(Storage):
+    """
+    Stands in for Cloudinary: uploads are copied into a local folder after a
+    simulated latency, and what is uploaded is listed with list_page(), one
+    request per page of page_size files, into a RemoteIndex as with Cloudinary.
+    """
+
+    def __init__(self, path, latency=0.0, page_size=500, folder="TranslationBag"):
+        self.path = path
+        self.latency = latency
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.resources = {}
+        self.uploaded_bytes = 0
+        self.list_requests = 0
+        os.makedirs(path, exist_ok=True)
+        self.remote_index = RemoteIndex(
+            os.path.join(path, "index", "remote_manifest.json"), folder, self.list_page
+        )
+
+    def list_page(self, folder, cursor=None):
+        """Returns (resources, next cursor) like a Cloudinary search."""
+        time.sleep(self.latency)
+        with self.lock:
+            self.list_requests += 1
+            names = sorted(self.resources)
+        start = int(cursor or 0)
+        end = start + self.page_size
+        resources = [
+            {"public_id": f"{folder}/{name}", "secure_url": self.resources[name]}
+            for name in names[start:end]
+        ]
+        return resources, str(end) if end < len(names) else None
+
+    def load(self, max_age=0):
+        self.remote_index.load(max_age)
+
+    def url(self, name):
+        return self.remote_index.get(name)
+
+    def put_one(self, name, source):
+        time.sleep(self.latency)
+        dest = os.path.join(self.path, os.path.basename(source))
+        shutil.copyfile(source, dest)
+        url = "file:///" + dest
+        with self.lock:
+            self.resources[name] = url
+            self.uploaded_bytes += os.path.getsize(dest)
+        self.remote_index.add(name, url)
+        return url
+
+    def attach(self, proc):
+        """Makes a processor upload to this stand-in instead of Cloudinary."""
+        proc.cfg["upload"] = True
+        proc.storage = self
+        proc.uploader = Uploader(
+            self.put_one, workers=proc.cfg.get("upload_workers") or 4
+        )
@@ -1,23 +1,30 @@
-import copy
 import hashlib
-import json
 import math
 import os
 import re
-import requests
 import shutil
 import sys
-from tkinter import messagebox
+import weakref
 
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
-from PIL import Image, ImageEnhance, ImageOps
-import cloudinary
-import cloudinary.uploader
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 
 # Local module import
-from modules.gui import App
-from modules import tts_templates
+# (PIL, cloudinary, requests and tkinter are only imported by the code that needs them)
+from modules import packing, scanner, tts_templates
+from modules.bag_writer import BagWriter, ShardWriter
+from modules.build_manifest import BuildManifest
+from modules.cache import CardCache, SheetCache, file_fingerprint, make_key
+from modules.card_data import CardDataCache
+from modules.card_meta import SIZE_CLASSES, CardMetaResolver
+from modules.encoder import QualitySearch
+from modules.memory import MemoryBudget, peak_rss
+from modules.pipeline import Pipeline
+from modules.remote_index import RemoteIndex
+from modules.storage import CloudinaryStorage, LocalStore, TempFolderStorage
+from modules.trace import NULL_TRACER, Tracer
+from modules.uploader import Uploader
 
 
 def make_id_range(start: int, end: int) -> list[str]:
@@ -37,6 +44,15 @@ class TTSBundleProcessor:
         "Tarot": (800, 1400),
     }
 
+    # Speed/quality tiers for resizing card images (see imaging.RESIZE_TIERS)
+    RESIZE_QUALITIES = ("fast", "balanced", "best")
+
+    # Where sheets and backs are uploaded to (see modules/storage.py)
+    STORAGES = ("cloudinary", "local")
+
+    # Extra saved objects with parts of the bag ("" = only the full bag)
+    SHARD_MODES = ("", "category", "cycle", "both")
+
     # Specific backs
     BACK_URLS = {
         # Encounter/Player are the "regular" backs
@@ -98,10 +114,56 @@ class TTSBundleProcessor:
         "VaultChamber": make_id_range(11596, 11603),
     }
 
+    # Reverse lookup of the ID groups (the first group wins like in the map above)
+    SPECIAL_ID_LOOKUP = {
+        card_id: special_type
+        for special_type, id_list in reversed(SPECIAL_ID_MAPS.items())
+        for card_id in id_list
+    }
+
     TDC_TASK_IDS = {
         str(i) + suffix for i in range(11753, 11761) for suffix in ("a", "b")
     }
 
+    # English entries that are also needed under other IDs
+    ENGLISH_ALIASES = {
+        # Special handling for some double-sided cards
+        **{
+            card_id: [card_id[:-1]]
+            for card_id in [
+                "03065b",
+                "03066b",
+                "03067b",
+                "03068b",
+                "03069b",
+                "03076a",
+                "03182b",
+                "03221b",
+                "03321a",
+                "03322a",
+                "03323a",
+                "04117a",
+                "04118a",
+                "04128a",
+                "04130a",
+                "04137a",
+                "05286a",
+                "05288a",
+            ]
+        },
+        # Special handling for Hank (who uses different IDs in TTS)
+        "10016a": ["10015-b1"],
+        "10016b": ["10015-b2"],
+        # Special handling for some Written in Rock locations
+        **{
+            card_id: [card_id + "a", card_id + "b"]
+            for card_id in ["10512", "10513", "10514"]
+        },
+    }
+    ENGLISH_ALIAS_IDS = {
+        alias for aliases in ENGLISH_ALIASES.values() for alias in aliases
+    }
+
     # Additions to the final name if suffix is present
     SUFFIX_MAP = {
         "-p": "(Parallel)",
@@ -112,30 +174,130 @@ class TTSBundleProcessor:
         "-c": "Upgrade Sheet",
     }
 
-    def __init__(self, cfg):
+    def __init__(self, cfg, confirm=None):
+        """
+        cfg: settings as in config.json
+        confirm: optional function(title, message) -> bool to ask the user
+        """
         self.cfg = cfg
+        self.confirm = confirm
+
+        if cfg.get("resize_quality", "balanced") not in self.RESIZE_QUALITIES:
+            raise ValueError(
+                f"resize_quality must be one of {', '.join(self.RESIZE_QUALITIES)}"
+            )
+        if not 1 <= cfg.get("img_count_per_sheet", 30) <= packing.MAX_CARDS_PER_SHEET:
+            raise ValueError(
+                f"img_count_per_sheet must be between 1 and {packing.MAX_CARDS_PER_SHEET}"
+            )
+        if cfg.get("storage", "cloudinary") not in self.STORAGES:
+            raise ValueError(f"storage must be one of {', '.join(self.STORAGES)}")
+        if cfg.get("shard_output", "") not in self.SHARD_MODES:
+            raise ValueError(
+                f"shard_output must be one of {', '.join(filter(None, self.SHARD_MODES))}"
+            )
+
+        # Local backs replace entries, so every processor needs its own copy
+        self.BACK_URLS = dict(self.BACK_URLS)
         self.script_dir = os.path.dirname(__file__)
-        self.temp_path = os.path.join(self.script_dir, "temp")
+        self.temp_path = self.cfg.get("temp_folder") or os.path.join(
+            self.script_dir, "temp"
+        )
+        self.cache_path = self.cfg.get("cache_folder") or os.path.join(
+            self.script_dir, "cache"
+        )
 
         # Configuration
         locale = self.cfg["locale"].lower()
-        self.ARKHAM_BUILD_URL = f"https://api.arkham.build/v1/cache/cards/{locale}"
+        self.locale = locale
+        self.API_URL = self.cfg.get(
+            "api_url", "https://api.arkham.build/v1/cache/cards"
+        )
+        self.ARKHAM_BUILD_URL = f"{self.API_URL}/{locale}"
 
         # State Management
         self.card_index = {}
         self.sheet_parameters = {}
+        self.back_sheets = {}
         self.reported_missing_url = {}
         self.deck_id_counter = 0
         self.deck_offset = self.string_to_3_digits(locale)
         self.translation_data = {}
         self.english_data = {}
         self.sheet_count_reached = False
+        self.decode_pool = None
+        self.memory_budget = None
+        self.build_manifest = None
+        self.preflight_report = None
+        self.scanned_files = []
+
+        # Names, backs and sizes of the cards, computed once per card
+        self.card_meta = CardMetaResolver(
+            self._find_card_data, self.SUFFIX_MAP, self.SPECIAL_ID_LOOKUP
+        )
+
+        # Timings of every stage, only recorded if a trace file is set
+        self.tracer = Tracer() if self.cfg.get("trace_file") else NULL_TRACER
 
-        # Initialize Cloudinary
-        cloudinary.config(
-            cloud_name=self.cfg["cloud_name"],
-            api_key=self.cfg["api_key"],
-            api_secret=self.cfg["api_secret"],
+        # Local copies of the card data (revalidated unless offline)
+        self.card_data = CardDataCache(
+            os.path.join(self.cache_path, "api"),
+            offline=self.cfg.get("offline", False),
+            max_age=self.cfg.get("api_cache_max_age_min", 0) * 60,
+        )
+
+        # Encoded sheets are kept between runs (0 MB = disabled)
+        self.sheet_cache = None
+        if self.cfg.get("sheet_cache_mb", 2048) > 0:
+            self.sheet_cache = SheetCache(
+                os.path.join(self.cache_path, "sheets"),
+                self.cfg.get("sheet_cache_mb", 2048),
+            )
+
+        # Resized card bitmaps are kept between runs as well (0 MB = disabled)
+        self.card_cache = None
+        if self.cfg.get("card_cache_mb", 4096) > 0:
+            self.card_cache = CardCache(
+                os.path.join(self.cache_path, "cards"),
+                self.cfg.get("card_cache_mb", 4096),
+            )
+
+        # Index of everything that is already uploaded
+        self.upload_folder = f"AH_LCG_{locale.upper()}"
+        self.remote_index = RemoteIndex(
+            os.path.join(self.cache_path, f"remote_{locale}.json"),
+            self.upload_folder,
+        )
+
+        self.uploader = None
+        self._init_storage()
+
+    def _init_storage(self):
+        """Sets up where sheets and backs are stored and the parallel uploader."""
+        if not self.cfg["upload"]:
+            # Everything stays in the temp folder
+            self.storage = TempFolderStorage(self.temp_path)
+            return
+
+        upload_workers = self.cfg.get("upload_workers") or 4
+        if self.cfg.get("storage", "cloudinary") == "local":
+            self.storage = LocalStore(
+                self.cfg.get("local_store_folder")
+                or os.path.join(self.cache_path, "store"),
+                self.cfg.get("local_store_url", "http://127.0.0.1:8642"),
+            )
+        else:
+            self.storage = CloudinaryStorage(
+                self.cfg, self.remote_index, connections=upload_workers
+            )
+
+        # Parallel uploads with retries
+        self.uploader = Uploader(
+            self.storage.put_one,
+            workers=upload_workers,
+            retries=self.cfg.get("upload_retries", 5),
+            is_retryable=self.storage.is_retryable,
+            is_rate_limited=self.storage.is_rate_limited,
         )
 
     def string_to_3_digits(self, input_string):
@@ -153,113 +315,79 @@ class TTSBundleProcessor:
 
         return three_digit_result
 
-    def load_translation_data(self):
-        try:
-            response = requests.get(self.ARKHAM_BUILD_URL)
-            response.raise_for_status()
+    def load_card_data(self):
+        """Fetches the translated and the English card data in parallel."""
+        # The English data is also the translation, so it's only fetched once
+        if self.locale == "en":
+            self.load_english_data(translation=True)
+            return
 
-            # Create a lookup map
-            for item in response.json()["data"]["all_card"]:
-                key = item["id"]
+        with ThreadPoolExecutor(2) as executor:
+            futures = [
+                executor.submit(self.load_translation_data),
+                executor.submit(self.load_english_data),
+            ]
+            for future in futures:
+                future.result()
 
-                # Special handling for Hank (who uses different IDs in TTS)
-                if key == "10016a":
-                    key = "10015-b1"
-                elif key == "10016b":
-                    key = "10015-b2"
+    def load_translation_data(self):
+        with self.tracer.span("load_translation_data", "data", locale=self.locale):
+            self._load_translation_data()
 
-                self.translation_data[key] = item
+    def _load_translation_data(self):
+        try:
+            # Create a lookup map while the data is streamed in
+            for item in self.card_data.iter_cards(self.locale, self.ARKHAM_BUILD_URL):
+                self._add_translation_item(item)
 
         except Exception as e:
             print(f"Error fetching translation data: {e}")
             sys.exit(1)
 
-    def load_english_data(self):
-        try:
-            response = requests.get(f"https://api.arkham.build/v1/cache/cards/en")
-            response.raise_for_status()
+    def _add_translation_item(self, item):
+        key = item["id"]
+
+        # Special handling for Hank (who uses different IDs in TTS)
+        if key == "10016a":
+            key = "10015-b1"
+        elif key == "10016b":
+            key = "10015-b2"
+
+        self.translation_data[key] = item
+
+    def load_english_data(self, translation=False):
+        """translation: also use the English data as the translation."""
+        with self.tracer.span("load_english_data", "data"):
+            self._load_english_data(translation)
 
-            # Create a lookup map
-            for item in response.json()["data"]["all_card"]:
+    def _load_english_data(self, translation=False):
+        try:
+            # Create a lookup map while the data is streamed in
+            for item in self.card_data.iter_cards("en", f"{self.API_URL}/en"):
                 key = item["id"]
-                self.english_data[key] = item
 
-            # Special handling for some double-sided cards
-            for id in [
-                "03065b",
-                "03066b",
-                "03067b",
-                "03068b",
-                "03069b",
-                "03076a",
-                "03182b",
-                "03221b",
-                "03321a",
-                "03322a",
-                "03323a",
-                "04117a",
-                "04118a",
-                "04128a",
-                "04130a",
-                "04137a",
-                "05286a",
-                "05288a",
-            ]:
-                self.english_data[id[:-1]] = self.english_data.get(id)
+                # Aliases take precedence over entries with the same ID
+                if key not in self.ENGLISH_ALIAS_IDS:
+                    self.english_data[key] = item
 
-            # Special handling for Hank (who uses different IDs in TTS)
-            self.english_data["10015-b1"] = self.english_data.get("10016a")
-            self.english_data["10015-b2"] = self.english_data.get("10016b")
+                for alias in self.ENGLISH_ALIASES.get(key, ()):
+                    self.english_data[alias] = item
 
-            # Special handling for some Written in Rock locations
-            for id in ["10512", "10513", "10514"]:
-                self.english_data[id + "a"] = self.english_data.get(id)
-                self.english_data[id + "b"] = self.english_data.get(id)
+                if translation:
+                    self._add_translation_item(item)
 
         except Exception as e:
             print(f"Error fetching english data: {e}")
             sys.exit(1)
 
-    def resolve_back_url(self, arkham_id, data, translated_data):
+    def resolve_back_url(self, arkham_id, data):
         # Double-sided cards use the specific back from the sheet
         if data.get("double_sided"):
-            back_id = f"{arkham_id}{self.BACK_SUFFIX}"
-
-            for s_param in self.sheet_parameters.values():
-                if s_param["sheet_type"] == "back" and back_id in s_param["id_list"]:
-                    return s_param.get("uploaded_url", self.BACK_URLS["Player"])
-
-        # Check for suffix (Upgradesheets from TSK)
-        if arkham_id.endswith("-c"):
-            return self.BACK_URLS["Upgradesheet"]
+            s_param = self.back_sheets.get(f"{arkham_id}{self.BACK_SUFFIX}")
+            if s_param:
+                return s_param.get("uploaded_url", self.BACK_URLS["Player"])
 
-        # Check for prefix (Concealed cards from TSK)
-        if arkham_id.startswith("HC"):
-            return self.BACK_URLS["Concealed"]
-
-        # Check for prefix (Tarot cards from RtTCU)
-        if arkham_id.startswith("TAR"):
-            return self.BACK_URLS["Tarot"]
-
-        # Check specific ID lists
-        for special_type, id_list in self.SPECIAL_ID_MAPS.items():
-            if arkham_id in id_list:
-                return self.BACK_URLS[special_type]
-
-        # Check for deck limit (Player Cards including bonded [deck_limit = 0])
-        if "deck_limit" in translated_data:
-            return self.BACK_URLS["Player"]
-
-        # Check for encounter code (Encounter Cards)
-        if "encounter_code" in translated_data:
-            return self.BACK_URLS["Encounter"]
-
-        # Final Fallback
-        return self.BACK_URLS["Player"]
-
-    def _save_json(self, data, path):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        return self.BACK_URLS[self.card_meta.get(arkham_id).back_type]
 
     def get_arkham_id(self, folder_path, file_name):
         base_name = os.path.splitext(file_name)[0]
@@ -307,27 +435,25 @@ class TTSBundleProcessor:
         return (key,)
 
     def scan_source(self):
-        """Walks the directory and builds the initial card index."""
-        print(f"Scanning: {self.cfg['source_folder']}")
-        for root, _, files in os.walk(self.cfg["source_folder"]):
-            path_parts = root.split(os.sep)
-
-            # Identify which whitelist folder this belongs to
-            folder_category = next((f for f in self.WHITELIST if f in path_parts), None)
-            if not folder_category:
-                continue
-
-            # Find the folder name directly after the folder_category
-            category_index = path_parts.index(folder_category)
-
-            # Check if there is a subfolder after the category, otherwise fallback to a default
-            folder_cycle_name = None
-            if category_index + 1 < len(path_parts):
-                folder_cycle_name = path_parts[category_index + 1]
+        """Scans the source folder (or reads a file list) and builds the initial card index."""
+        source_folder = self.cfg["source_folder"]
+        if self.cfg.get("source_file_list"):
+            print(f"Reading file list: {self.cfg['source_file_list']}")
+            folders = scanner.read_file_list(
+                self.cfg["source_file_list"], source_folder, self.WHITELIST
+            )
+        else:
+            print(f"Scanning: {source_folder}")
+            folders = scanner.scan_tree(
+                source_folder, self.WHITELIST, self.cfg.get("scan_workers") or 16
+            )
 
+        # Categories are the whitelisted folders, cycles the folders directly below them
+        for folder_category, folder_cycle_name, root, files in folders:
+            root_prefix = os.path.join(root, "")
+            rel_prefix = os.path.join(os.path.relpath(root, source_folder), "")
             for file in files:
-                if not file.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-                    continue
+                self.scanned_files.append(rel_prefix + file)
                 try:
                     arkham_id = self.get_arkham_id(root, file)
                     is_back = arkham_id.endswith(self.BACK_SUFFIX)
@@ -348,7 +474,7 @@ class TTSBundleProcessor:
 
                     self.card_index[arkham_id] = {
                         "cycle_name": cycle_name,
-                        "file_path": os.path.join(root, file),
+                        "file_path": root_prefix + file,
                         "double_sided": is_back,  # Will be updated for fronts in sorting phase
                         "category": folder_category,
                     }
@@ -367,7 +493,7 @@ class TTSBundleProcessor:
                         # Create the second entry as a flipped "-back" version
                         self.card_index[back_id] = {
                             "cycle_name": cycle_name,
-                            "file_path": os.path.join(root, file),
+                            "file_path": root_prefix + file,
                             "double_sided": True,
                             "category": folder_category,
                         }
@@ -400,8 +526,7 @@ class TTSBundleProcessor:
             if not p_back:
                 continue
 
-            translated_data = self.get_translated_data(arkham_id)
-            reg_id = translated_data.get("alternate_of_code")
+            reg_id = self.card_meta.get(arkham_id).alternate_of
 
             if reg_id:
                 p_front = self.card_index.get(arkham_id)
@@ -458,8 +583,48 @@ class TTSBundleProcessor:
         for p_id in parallel_ids_to_remove:
             self.card_index.pop(p_id, None)
 
+    def preflight_check(self):
+        """Checks all source images before any sheet is created."""
+        if not self.cfg.get("preflight", True):
+            return None
+
+        from modules import preflight
+
+        print("[INFO]     Checking source images...")
+        report = preflight.check_images(
+            [data["file_path"] for data in self.card_index.values()],
+            self.CARD_SIZES,
+            self.cfg.get("scan_workers") or 16,
+        )
+        self.preflight_report = report
+
+        for path, warnings in report["warnings"].items():
+            print(f"[WARNING] {path}: {', '.join(warnings)}")
+        for path, errors in report["errors"].items():
+            print(f"[ERROR]   {path}: {', '.join(errors)}")
+        print(
+            f"[INFO]     Checked {report['checked']} images: "
+            f"{len(report['errors'])} bad, {len(report['warnings'])} with warnings"
+        )
+
+        if report["errors"] and self.cfg.get("fail_on_bad_images", True):
+            print(
+                "[ERROR] Fix the bad images or build with placeholders "
+                "(--no-fail-on-bad-images)."
+            )
+            sys.exit(1)
+        return report
+
     def organize_sheets(self):
         """Groups cards into sheet batches separated by WHITELIST and Back URLs."""
+        optimize = self.cfg.get("optimize_sheets", False)
+        previous_sheets = {}
+        if self.build_manifest and self.cfg.get("stable_sheets", True):
+            # Switching the layout rearranges everything once
+            if self.build_manifest.settings.get("optimize_sheets", False) != optimize:
+                print("[INFO]     Sheet layout changed, rearranging all sheets")
+            else:
+                previous_sheets = self.build_manifest.card_sheets()
 
         # Loop through each category in the whitelist separately
         for category in self.WHITELIST:
@@ -476,8 +641,7 @@ class TTSBundleProcessor:
             # Pre-calculate back URLs for all cards to allow grouping by back
             enriched_cards = []
             for arkham_id, data in sorted_cards:
-                translated_data = self.get_translated_data(arkham_id)
-                back_url = self.resolve_back_url(arkham_id, data, translated_data)
+                back_url = self.resolve_back_url(arkham_id, data)
                 enriched_cards.append((arkham_id, data, back_url))
 
             batches = {
@@ -494,44 +658,134 @@ class TTSBundleProcessor:
                 ],
             }
 
-            for sheet_type, card_list in batches.items():
-                last_group_key = (None, None)
-                current_batch = []
-
-                for arkham_id, data, back_url in card_list:
-                    # Create a unique key for this specific combination
-                    # Double-sided cards don't care about shared backs
-                    group_key = (
-                        data["cycle_name"],
-                        back_url if sheet_type == "single" else "double-sided",
-                    )
-                    is_first_card = last_group_key == (None, None)
-
-                    # Start new sheet if cycle/back changes OR sheet is full
-                    if not is_first_card and (
-                        group_key != last_group_key
-                        or len(current_batch) >= self.cfg["img_count_per_sheet"]
-                    ):
-                        self._create_sheet_param(
-                            current_batch, sheet_type, last_group_key[1]
-                        )
-                        current_batch = []
-
-                    data["card_id"] = len(current_batch)
-                    data["deck_id"] = self.deck_id_counter + 1
-                    current_batch.append((arkham_id, data))
-                    last_group_key = group_key
-
-                if current_batch:
-                    self._create_sheet_param(
-                        current_batch,
-                        sheet_type,
-                        last_group_key[1],
+            # Merge groups with the same back from different cycles
+            if optimize:
+                back_order = {}
+                for _, _, back_url in batches["single"]:
+                    back_order.setdefault(back_url, len(back_order))
+                batches["single"].sort(key=lambda c: back_order[c[2]])
+
+            for card_list, back_url in self._split_sheets(
+                batches["single"], "single", previous_sheets
+            ):
+                self._create_sheet_param(card_list, "single", back_url)
+
+            # Sheet breaks are only decided on the fronts, each back sheet holds
+            # the backs of one front sheet in the same order and grid
+            backs = {arkham_id: data for arkham_id, data, _ in batches["back"]}
+            back_sheets = []
+            for card_list, back_url in self._split_sheets(
+                batches["front"], "front", previous_sheets
+            ):
+                front_sheet = self._create_sheet_param(card_list, "front", back_url)
+                back_list = [
+                    (back_id, backs.pop(back_id))
+                    for back_id in (
+                        f"{arkham_id}{self.BACK_SUFFIX}" for arkham_id, _ in card_list
                     )
+                    if back_id in backs
+                ]
+                if back_list:
+                    back_sheets.append((back_list, back_url, front_sheet["grid_size"]))
+
+            for back_list, back_url, grid_size in back_sheets:
+                self._create_sheet_param(back_list, "back", back_url, grid_size)
+
+            # Backs without a front in this category
+            orphans = [card for card in batches["back"] if card[0] in backs]
+            for card_list, back_url in self._split_sheets(orphans, "back", {}):
+                self._create_sheet_param(card_list, "back", back_url)
+
+        stats = packing.summarize(
+            [
+                (data["card_count"], data["grid_size"], self._get_card_size(data))
+                for data in self.sheet_parameters.values()
+            ],
+            self.cfg["img_max_kb"],
+        )
+        print(
+            f"[INFO]     {stats['sheets']} sheets, {stats['cards']} cards, "
+            f"{stats['fill_ratio']:.0%} filled, {stats['pixels'] / 1e6:.0f} MP, "
+            f"~{stats['estimated_bytes'] / 1024**2:.1f} MB"
+        )
+
+        if self.build_manifest and self.build_manifest.sheets:
+            changed = self.build_manifest.count_changed_sheets(
+                data["id_list"] for data in self.sheet_parameters.values()
+            )
+            print(
+                f"[INFO]     {changed} of {len(self.sheet_parameters)} sheets "
+                "changed since the last build"
+            )
+
+    def _split_sheets(self, card_list, sheet_type, previous_sheets):
+        """
+        Splits sorted (arkham_id, data, back_url) cards into sheets. Returns
+        a list of ([(arkham_id, data), ...], back URL) per sheet.
+        """
+        optimize = self.cfg.get("optimize_sheets", False)
+        limit = self.cfg["img_count_per_sheet"]
+        sheets = []
+        last_group_key = (None, None)
+        current_batch = []
+        current_sheet = None
+
+        for arkham_id, data, back_url in card_list:
+            # Create a unique key for this specific combination
+            # Double-sided cards don't care about shared backs
+            group_key = (
+                None if optimize else data["cycle_name"],
+                back_url if sheet_type == "single" else "double-sided",
+            )
+            is_first_card = last_group_key == (None, None)
+
+            # Keep cards on the sheet they were on in the last build,
+            # so an added or removed card doesn't shift all later sheets
+            previous_sheet = previous_sheets.get(arkham_id)
+            leaves_sheet = (
+                previous_sheet is not None
+                and current_sheet is not None
+                and previous_sheet != current_sheet
+            )
 
-    def _create_sheet_param(self, batch, sheet_type, back_url):
+            # Start new sheet if cycle/back/previous sheet changes OR sheet is full
+            # (optimized runs are split evenly below)
+            if not is_first_card and (
+                group_key != last_group_key
+                or leaves_sheet
+                or (not optimize and len(current_batch) >= limit)
+            ):
+                sheets.append((current_batch, last_group_key[1]))
+                current_batch = []
+                current_sheet = None
+
+            current_batch.append((arkham_id, data))
+            last_group_key = group_key
+            current_sheet = current_sheet or previous_sheet
+
+        if current_batch:
+            sheets.append((current_batch, last_group_key[1]))
+        if not optimize:
+            return sheets
+
+        # Spread the cards of a run evenly, e.g. 31 cards give sheets of 16
+        # and 15 instead of 30 and 1, so every grid fits its cards tightly
+        balanced = []
+        for batch, back_url in sheets:
+            count = math.ceil(len(batch) / limit)
+            for i in range(count):
+                start, end = i * len(batch) // count, (i + 1) * len(batch) // count
+                balanced.append((batch[start:end], back_url))
+        return balanced
+
+    def _create_sheet_param(self, batch, sheet_type, back_url, grid_size=None):
+        """Adds a sheet for batch and returns its parameters."""
         self.deck_id_counter += 1
-        self.sheet_parameters[self.deck_id_counter] = {
+        for card_id, (_, data) in enumerate(batch):
+            data["card_id"] = card_id
+            data["deck_id"] = self.deck_id_counter
+
+        s_param = self.sheet_parameters[self.deck_id_counter] = {
             "img_path_list": [d["file_path"] for _, d in batch],
             "id_list": [arkham_id for arkham_id, _ in batch],
             "start_id": batch[0][0],
@@ -540,48 +794,85 @@ class TTSBundleProcessor:
             "card_count": len(batch),
             "back_url": back_url,
         }
+        if grid_size:
+            s_param["grid_size"] = grid_size
+        elif self.cfg.get("optimize_sheets", False):
+            s_param["grid_size"] = packing.optimal_grid_size(
+                len(batch), self._get_card_size(s_param)
+            )
+        else:
+            s_param["grid_size"] = packing.fixed_grid_size(len(batch))
+
+        # Index back sheets for resolve_back_url
+        if sheet_type == "back":
+            for arkham_id, _ in batch:
+                self.back_sheets.setdefault(arkham_id, s_param)
+        return s_param
 
     def _load_and_process_card(self, args):
         """Helper for parallel processing"""
         path, img_w, img_h = args
-        try:
-            with Image.open(path) as img:
-                # Rotate horizontal images 90° clockwise
-                if img.size[0] > img.size[1]:
-                    img = img.rotate(-90, expand=True)
-
-                # Resize and convert to RGB
-                img = img.resize((img_w, img_h), Image.Resampling.LANCZOS).convert(
-                    "RGB"
-                )
 
-                contrast_mult = self.cfg.get("img_contrast", 100)
-                if contrast_mult != 100:
-                    # Normalize image by cutting off 1% of extreme pixels
-                    img = ImageOps.autocontrast(img, cutoff=1)
-
-                    # Enhance contrast
-                    img = ImageEnhance.Contrast(img).enhance(contrast_mult / 100)
+        # Reuse the processed bitmap from a previous run
+        cache_key = None
+        if self.card_cache:
+            try:
+                cache_key = make_key(
+                    "card",
+                    file_fingerprint(path, self.cfg.get("cache_hash_content", False)),
+                    (img_w, img_h),
+                    self.cfg.get("img_contrast", 100),
+                    self.cfg.get("resize_quality", "balanced"),
+                )
+            except OSError:
+                pass
+            else:
+                with self.tracer.span(
+                    "card_cache", "card", card=os.path.basename(path)
+                ):
+                    cached_img = self.card_cache.load(cache_key, (img_w, img_h))
+                if cached_img:
+                    return cached_img
 
-                return img
+        from modules import imaging
 
+        try:
+            img = imaging.load_card(
+                path,
+                (img_w, img_h),
+                self.cfg.get("img_contrast", 100),
+                self.cfg.get("resize_quality", "balanced"),
+                self.tracer,
+                reserve=partial(self.memory_budget.reserve, kind="decode"),
+            )
         except Exception as e:
             print(f"Error loading {path}: {e}")
-            return Image.new("RGB", (img_w, img_h), (255, 0, 0))  # Red error card
+            return imaging.error_card((img_w, img_h))
+
+        if cache_key:
+            self.card_cache.store(cache_key, img)
+
+        return img
 
     def ensure_temp_path(self):
         # Setup Temp Directory
         if os.path.exists(self.temp_path):
-            # Show a confirmation popup
-            confirm = messagebox.askyesno(
-                title="Warning: Temp Folder Exists",
-                message=f"The temp directory already exists:\n{self.temp_path}\n\nTo continue, it will get reset.\nContinue?",
-            )
+            # Reset without asking if the settings allow it, otherwise ask
+            confirm = self.cfg.get("reset_temp", False)
+            if not confirm and self.confirm:
+                confirm = self.confirm(
+                    "Warning: Temp Folder Exists",
+                    f"The temp directory already exists:\n{self.temp_path}\n\nTo continue, it will get reset.\nContinue?",
+                )
 
             if confirm:
                 shutil.rmtree(self.temp_path)
-            else:
+            elif self.confirm:
                 raise SystemExit("User cancelled folder overwrite.")
+            else:
+                raise SystemExit(
+                    f"The temp directory already exists: {self.temp_path} (use --reset-temp)"
+                )
 
         os.makedirs(self.temp_path)
 
@@ -599,6 +890,8 @@ class TTSBundleProcessor:
         # Supported image extensions
         extensions = [".png", ".jpg", ".jpeg", ".webp"]
 
+        # (key, online name, file to store) for every local back
+        backs = []
         for key in list(self.BACK_URLS.keys()):
             for ext in extensions:
                 local_path = os.path.join(self.local_backs_path, f"{key}{ext}")
@@ -609,80 +902,108 @@ class TTSBundleProcessor:
                 online_name = f"Back_{self.cfg['locale'].upper()}_{key}"
 
                 # Determine target dimensions based on the key
-                if key == "Tarot":
-                    target_w, target_h = self.CARD_SIZES["Tarot"]
-                elif key == "Concealed":
-                    target_w, target_h = self.CARD_SIZES["Mini"]
-                else:
-                    target_w, target_h = self.CARD_SIZES["Regular"]
+                target_w, target_h = self.CARD_SIZES[SIZE_CLASSES.get(key, "Regular")]
 
                 # Determine destination
                 dest_path = os.path.join(self.temp_path, f"{online_name}{ext}")
                 image_resized = False
 
                 # Check dimensions and resize if necessary
+                # (the resized copy in the temp folder is used for uploading/copying)
                 try:
-                    with Image.open(local_path) as img:
-                        if img.size != (target_w, target_h):
-                            print(
-                                f"[RESIZING] {key} from {img.size} to {(target_w, target_h)}"
-                            )
-                            # Resize without forcing aspect ratio
-                            resized_img = img.resize(
-                                (target_w, target_h), Image.Resampling.LANCZOS
-                            )
-
-                            # Create a temporary file path to store the resized image for uploading/copying
-                            resized_img.save(dest_path)
-                            image_resized = True
+                    from modules import imaging
+
+                    original_size = imaging.resize_back(
+                        local_path, (target_w, target_h), dest_path
+                    )
+                    if original_size:
+                        print(
+                            f"[RESIZING] {key} from {original_size} to {(target_w, target_h)}"
+                        )
+                        image_resized = True
 
                 except Exception as e:
                     print(f"[ERROR]   Failed to process/resize image {key}: {e}")
 
-                # Handle the uploading or copying logic
-                if not self.cfg["upload"]:
-                    if not image_resized:
-                        # If resizing was skipped, copy the original file over
-                        shutil.copy2(local_path, dest_path)
-
-                    print(f"[INFO]     Copied local back to temp: {dest_path}")
-                    self.BACK_URLS[key] = "file:///" + dest_path
-                else:
-                    # Check if already uploaded to save time/quota
-                    existing_url = self.check_online_exists(online_name)
-                    if existing_url:
-                        self.BACK_URLS[key] = existing_url
-                    else:
-                        print(f"[UPLOADING] {online_name}...")
-                        if image_resized:
-                            self.BACK_URLS[key] = self.upload_to_cloud(
-                                online_name, dest_path
-                            )
-                        else:
-                            self.BACK_URLS[key] = self.upload_to_cloud(
-                                online_name, local_path
-                            )
+                # If resizing was skipped, the original file is stored
+                backs.append(
+                    (key, online_name, dest_path if image_resized else local_path)
+                )
                 break  # Found the file, move to next key
 
-    def process_images(self):
+        # Check if already uploaded to save time/quota
+        urls = {}
+        if self.cfg["upload"]:
+            urls = self.storage.exists([online_name for _, online_name, _ in backs])
+
+        missing = [(name, path) for _, name, path in backs if name not in urls]
+        if self.cfg["upload"]:
+            for name, _ in missing:
+                print(f"[UPLOADING] {name}...")
+        urls.update(self.store_files(missing))
+
+        for key, online_name, _ in backs:
+            self.BACK_URLS[key] = urls[online_name]
+            if not self.cfg["upload"]:
+                print(
+                    f"[INFO]     Copied local back to temp: "
+                    f"{urls[online_name].removeprefix('file:///')}"
+                )
+
+    def store_files(self, items):
         """
-        1. Stitches card images into sheets.
-        2. Uploads sheets to Cloudinary (or uses local file:/// paths).
+        Stores (name, path) items and returns name -> URL. Uploads run in
+        parallel and are retried.
         """
+        if not self.uploader:
+            return self.storage.put(items)
 
-        # Process Card Sheets
-        for d_id, data in self.sheet_parameters.items():
-            # Dimensions
-            img_w, img_h = self.CARD_SIZES["Regular"]
+        futures = {
+            name: self.uploader.submit(name, path, upload_func=self.storage.put_one)
+            for name, path in items
+        }
+        return {name: future.result() for name, future in futures.items()}
 
-            # RtTCU Tarot handling
-            if data["back_url"] == self.BACK_URLS["Tarot"]:
-                img_w, img_h = self.CARD_SIZES["Tarot"]
+    def process_images(self):
+        """
+        1. Stitches card images into sheets.
+        2. Uploads sheets to the storage (or uses local file:/// paths).
 
-            # TSK Concealed Minicard handling
-            if data["back_url"] == self.BACK_URLS["Concealed"]:
-                img_w, img_h = self.CARD_SIZES["Mini"]
+        Assembly, encoding and uploading run as overlapping pipeline stages, so
+        the next sheet is assembled while earlier ones are encoded or uploaded.
+        """
+        jobs = self.get_sheet_jobs()
 
+        # Card decoding is shared by all sheets that are assembled at the same time
+        self.decode_pool = ThreadPoolExecutor(self.cfg.get("decode_workers") or None)
+        self.memory_budget = MemoryBudget(
+            self.cfg.get("memory_budget_mb", 2048) * 1024**2
+        )
+        try:
+            Pipeline(
+                self.get_pipeline_stages(), self.cfg.get("pipeline_queue_size", 2)
+            ).run(jobs)
+        finally:
+            self.decode_pool.shutdown()
+            self.finish_uploads()
+            self.print_memory_report()
+
+    def print_memory_report(self):
+        budget = self.memory_budget
+        report = (
+            f"{budget.peak_used / 1024**2:.0f} MB of sheets and decodes, "
+            f"up to {budget.peak_in_flight.get('sheet', 0)} sheets and "
+            f"{budget.peak_in_flight.get('decode', 0)} decodes in flight"
+        )
+        rss = peak_rss()
+        if rss:
+            report = f"{rss / 1024**2:.0f} MB RSS, {report}"
+        print(f"[INFO]     Peak memory: {report}")
+
+    def get_sheet_jobs(self):
+        """Returns (online name, sheet parameters) for every sheet to process."""
+        jobs = []
+        for d_id, data in self.sheet_parameters.items():
             if d_id > self.cfg["max_sheet_count"]:
                 self.sheet_count_reached = True
                 print(
@@ -691,44 +1012,196 @@ class TTSBundleProcessor:
                 break
 
             online_name = f"Sheet_{self.cfg['locale'].upper()}_{data['start_id']}_{data['end_id']}"
+            data["online_name"] = online_name
+            jobs.append((online_name, data))
+        return jobs
+
+    def get_pipeline_stages(self):
+        """Returns (name, function, worker count) for every pipeline stage."""
+        # Worker counts per stage (0 = pick automatically)
+        cpu_count = os.cpu_count() or 1
+        stages = [
+            ("assemble", self._assemble_sheet, self.cfg.get("assemble_workers") or 2),
+            ("encode", self._encode_sheet, self.cfg.get("encode_workers") or cpu_count),
+        ]
+        if self.cfg["upload"]:
+            # Only hands sheets to the uploader, which has its own workers
+            stages.append(("upload", self._upload_sheet, 1))
+        return stages
+
+    def _is_reusable_url(self, url):
+        """Local sheets only exist until the temp folder is reset."""
+        if url.startswith("file:///"):
+            return os.path.exists(url.removeprefix("file:///"))
+        return self.cfg["upload"]
+
+    def finish_uploads(self):
+        """
+        Waits for queued uploads, stops the uploader and raises if any of
+        them failed.
+        """
+        if not self.uploader:
+            return
 
-            # Check Cloudinary First to skip redundant processing
-            if self.cfg["upload"]:
-                existing_url = self.check_online_exists(online_name)
-                if existing_url:
-                    print(f"[SKIPPING] {online_name} (Already Online)")
-                    data["uploaded_url"] = existing_url
-                    continue
-
-            # Create Sheet
-            print(f"[CREATING] {online_name}")
-            cols = min(data["card_count"], 10)
-            rows = math.ceil(data["card_count"] / 10)
-            data["grid_size"] = (rows, cols)
-
-            # Load and resize all images for this specific sheet
-            with ThreadPoolExecutor() as executor:
-                tasks = [(path, img_w, img_h) for path in data["img_path_list"]]
-                resized_images = list(executor.map(self._load_and_process_card, tasks))
-
-            # Assemble the sheet
-            sheet_img = Image.new("RGB", (cols * img_w, rows * img_h))
-            for i, img in enumerate(resized_images):
+        self.uploader.wait()
+        self.uploader.shutdown()
+
+        # Everything else is uploaded and recorded, so a re-run only repeats these
+        if self.uploader.failed:
+            names = ", ".join(sorted(self.uploader.failed))
+            raise RuntimeError(f"Uploads failed after retries: {names}")
+
+    def _get_card_size(self, data):
+        """Returns the card dimensions for a sheet based on its back."""
+        # Double-sided cards have the regular size
+        if data["sheet_type"] != "single":
+            return self.CARD_SIZES["Regular"]
+
+        # Cards on a sheet share their back, and with it their size
+        # (RtTCU Tarot cards and TSK Concealed Minicards)
+        return self.CARD_SIZES[self.card_meta.get(data["id_list"][0]).size_class]
+
+    def _assemble_sheet(self, job):
+        """Pipeline stage: loads the cards of a sheet and pastes them together."""
+        online_name, data = job
+        img_w, img_h = self._get_card_size(data)
+        rows, cols = data["grid_size"]
+
+        data["content_key"] = self._sheet_content_key(data, (img_w, img_h))
+
+        # Skip sheets that are unchanged since the last build
+        previous = None
+        if self.build_manifest:
+            previous = self.build_manifest.get_sheet(online_name)
+            if (
+                previous
+                and data["content_key"]
+                and previous["content_key"]
+                == self._previous_content_key(data, (img_w, img_h))
+                and self._is_reusable_url(previous["url"])
+            ):
+                print(f"[SKIPPING] {online_name} (Unchanged)")
+                data["uploaded_url"] = previous["url"]
+                return None
+
+        # Check Cloudinary First to skip redundant processing
+        # (unless the last build uploaded different content under this name)
+        if self.cfg["upload"] and not previous:
+            existing_url = self.check_online_exists(online_name)
+            if existing_url:
+                print(f"[SKIPPING] {online_name} (Already Online)")
+                data["uploaded_url"] = existing_url
+                return None
+
+        # Reuse the sheet from a previous run if none of its inputs changed
+        out_path = os.path.join(self.temp_path, f"{online_name}.webp")
+        with self.tracer.span("sheet_cache", "sheet", sheet=online_name):
+            cached = (
+                self.sheet_cache
+                and data["content_key"]
+                and self.sheet_cache.copy_to(data["content_key"], out_path)
+            )
+        if cached:
+            print(f"[CACHED]   {online_name}")
+            return online_name, data, None
+
+        # Create Sheet
+        print(f"[CREATING] {online_name}")
+        from modules import imaging
+
+        # Wait until the sheet fits into the memory budget, it is released
+        # when the canvas is gone (after encoding, or if the build is aborted)
+        release = self.memory_budget.reserve(self._sheet_memory((img_w, img_h), data))
+        sheet_img = imaging.new_sheet((cols * img_w, rows * img_h))
+        weakref.finalize(sheet_img, release)
+
+        # Load and resize all images for this specific sheet and paste each one
+        # as soon as it is ready, so only the cards being decoded are in memory
+        with self.tracer.span("assemble", "sheet", sheet=online_name):
+            futures = {
+                self.decode_pool.submit(
+                    self._load_and_process_card, (path, img_w, img_h)
+                ): i
+                for i, path in enumerate(data["img_path_list"])
+            }
+            for future in as_completed(futures):
+                i = futures.pop(future)
+                img = future.result()
                 x = (i % cols) * img_w
                 y = (i // cols) * img_h
-                sheet_img.paste(img, (x, y))
+                with self.tracer.span("paste", "sheet", sheet=online_name):
+                    sheet_img.paste(img, (x, y))
                 img.close()
 
-            # Save locally to temp folder
-            out_path = os.path.join(self.temp_path, f"{online_name}.webp")
+        return online_name, data, sheet_img
+
+    def _sheet_memory(self, card_size, data):
+        """Estimates the bytes a sheet needs until it is encoded."""
+        rows, cols = data["grid_size"]
+        canvas = rows * cols * card_size[0] * card_size[1] * 3
+
+        # Parallel quality probes each encode their own copy
+        search_width = self.cfg.get("encode_search_width", 1)
+        copies = search_width if search_width > 1 else 0
+        return canvas * (1 + copies)
+
+    def _sheet_content_key(self, data, card_size, hash_content=None):
+        """Hashes everything that determines the encoded sheet."""
+        if hash_content is None:
+            hash_content = self.cfg.get("cache_hash_content", False)
+        try:
+            fingerprints = [
+                file_fingerprint(path, hash_content) for path in data["img_path_list"]
+            ]
+        except OSError:
+            return None
+
+        return make_key(
+            "sheet",
+            fingerprints,
+            card_size,
+            data["grid_size"],
+            self.cfg.get("img_contrast", 100),
+            self.cfg.get("resize_quality", "balanced"),
+            self.cfg["img_quality"],
+            self.cfg["img_max_kb"],
+        )
+
+    def _encode_sheet(self, job):
+        """Pipeline stage: saves a sheet locally to the temp folder."""
+        online_name, data, sheet_img = job
+        out_path = os.path.join(self.temp_path, f"{online_name}.webp")
+
+        # Sheets from the cache are already in place
+        if sheet_img is not None:
             self.save_with_retry(sheet_img, out_path)
+            sheet_img.close()
+            if self.sheet_cache and data["content_key"]:
+                self.sheet_cache.put(data["content_key"], out_path)
 
-            # Maybe upload sheet
-            if self.cfg["upload"]:
-                print(f"[UPLOADING] {online_name}...")
-                data["uploaded_url"] = self.upload_to_cloud(online_name, out_path)
-            else:
-                data["uploaded_url"] = "file:///" + out_path
+        if not self.cfg["upload"]:
+            data["uploaded_url"] = self.storage.put_one(online_name, out_path)
+            return None
+
+        return online_name, data, out_path
+
+    def _upload_sheet(self, job):
+        """Pipeline stage: uploads a saved sheet."""
+        online_name, data, out_path = job
+        print(f"[UPLOADING] {online_name}...")
+
+        def set_url(url):
+            data["uploaded_url"] = url
+
+        def upload(name, path):
+            # Every attempt is recorded on its own
+            with self.tracer.span("upload", "sheet", sheet=name) as span:
+                span.bytes = os.path.getsize(path)
+                return self.storage.put_one(name, path)
+
+        self.uploader.submit(
+            online_name, out_path, callback=set_url, upload_func=upload
+        )
 
     def save_with_retry(self, image, path):
         # 6 is "best/slowest", 4 is "balanced", 0 is "fastest".
@@ -738,35 +1211,40 @@ class TTSBundleProcessor:
         name = os.path.basename(path)
         print(f"[SAVING]   {name}...")
 
-        quality = self.cfg["img_quality"]
-        while True:
-            image.save(path, format="WebP", quality=quality, method=webp_method)
-            file_size = os.path.getsize(path) // 1024
-            if file_size < self.cfg["img_max_kb"] or quality <= 50:
-                print(f"[SAVED]    {name} at {quality}% quality ({file_size} KB)")
-                break
-
-            # Adaptive quality drop: if we're way over, drop by 10, else 5
-            drop = 10 if file_size > (self.cfg["img_max_kb"] * 1.5) else 5
-            quality -= drop
-
-    def check_online_exists(self, name):
+        # Search the quality in memory and only write the winning encode
+        search = QualitySearch(
+            self.cfg["img_max_kb"],
+            method=webp_method,
+            search_width=self.cfg.get("encode_search_width", 1),
+            predict=self.cfg.get("encode_predict_size", True),
+            tracer=self.tracer,
+            name=os.path.splitext(name)[0],
+        )
+        data, quality, _ = search.search(image, self.cfg["img_quality"])
+        with self.tracer.span("write", "sheet", sheet=search.name) as span:
+            with open(path, "wb") as f:
+                f.write(data)
+            span.bytes = len(data)
+
+        file_size = len(data) // 1024
+        print(f"[SAVED]    {name} at {quality}% quality ({file_size} KB)")
+
+    def load_remote_index(self):
+        """Lists all stored files once, so existence checks become lookups."""
+        max_age = self.cfg.get("remote_index_max_age_min", 0) * 60
         try:
-            res = cloudinary.Search().expression(f"public_id={name}").execute()
-            if res.get("total_count", 0) > 0:
-                return res["resources"][0]["secure_url"]
-        except Exception:
-            return None
+            self.storage.load(max_age)
+        except Exception as e:
+            print(f"[WARNING] Could not list uploaded files: {e}")
 
-    def upload_to_cloud(self, name, path):
-        folder = f"AH_LCG_{self.cfg['locale'].upper()}"
-        res = cloudinary.uploader.upload(path, public_id=name, folder=folder)
-        return res.get("secure_url")
+    def check_online_exists(self, name):
+        with self.tracer.span("exists", "sheet", sheet=name):
+            return self.storage.exists([name]).get(name)
 
     def get_translated_data(self, arkham_id):
-        # Remove specific suffix if possible
-        clean_id = re.sub(r"-(p[fb]|[tcp])$", "", arkham_id)
+        return self.card_meta.get(arkham_id).data
 
+    def _find_card_data(self, clean_id):
         if clean_id in self.translation_data:
             return self.translation_data[clean_id]
 
@@ -775,6 +1253,90 @@ class TTSBundleProcessor:
 
         return {}
 
+    def _previous_content_key(self, data, card_size):
+        """
+        Returns the content key of a sheet as the previous build computed it,
+        which differs if it identified the files differently (e.g. a batch
+        build, which hashes their content).
+        """
+        hash_content = self.build_manifest.settings.get("cache_hash_content", False)
+        if hash_content == self.cfg.get("cache_hash_content", False):
+            return data["content_key"]
+        return self._sheet_content_key(data, card_size, hash_content)
+
+    def _card_fingerprints(self, hash_content=None):
+        if hash_content is None:
+            hash_content = self.cfg.get("cache_hash_content", False)
+        fingerprints = {}
+        for arkham_id, data in self.card_index.items():
+            try:
+                fingerprints[arkham_id] = file_fingerprint(
+                    data["file_path"], hash_content
+                )
+            except OSError:
+                pass
+        return fingerprints
+
+    def load_build_manifest(self):
+        """Compares the source folder with the manifest of the previous build."""
+        if not self.cfg.get("incremental", True):
+            return
+
+        self.build_manifest = BuildManifest(
+            os.path.join(
+                self.cfg["output_folder"],
+                f"TranslationBag - {self.cfg['locale'].upper()}.manifest",
+            )
+        )
+        if not self.build_manifest.load():
+            print("[INFO]     No previous build manifest, building everything")
+            return
+
+        # Compare with the fingerprints the previous build recorded
+        changed, added, removed = self.build_manifest.diff_cards(
+            self._card_fingerprints(
+                self.build_manifest.settings.get("cache_hash_content", False)
+            )
+        )
+        print(
+            f"[INFO]     Since the last build: {len(changed)} changed, "
+            f"{len(added)} added, {len(removed)} removed cards"
+        )
+
+    def save_build_manifest(self):
+        """Records the result of this build for the next incremental build."""
+        if not self.build_manifest:
+            return
+
+        fingerprints = self._card_fingerprints()
+        cards = {}
+        sheets = {}
+        for data in self.sheet_parameters.values():
+            if not data.get("uploaded_url") or not data.get("content_key"):
+                continue
+
+            sheets[data["online_name"]] = {
+                "content_key": data["content_key"],
+                "url": data["uploaded_url"],
+                "id_list": data["id_list"],
+            }
+            for arkham_id in data["id_list"]:
+                if arkham_id in fingerprints:
+                    cards[arkham_id] = {
+                        "fingerprint": fingerprints[arkham_id],
+                        "sheet": data["online_name"],
+                    }
+
+        self.build_manifest.save(
+            cards,
+            sheets,
+            self.scanned_files,
+            {
+                "optimize_sheets": self.cfg.get("optimize_sheets", False),
+                "cache_hash_content": self.cfg.get("cache_hash_content", False),
+            },
+        )
+
     def build_tts_json(self):
         print("Building TTS Bag...")
 
@@ -794,132 +1356,164 @@ class TTSBundleProcessor:
                     )
                 continue
 
-            # Get data from arkham.build API with translated fields
-            translated_data = self.get_translated_data(arkham_id)
-
-            # Create a copy of the template
-            new_card = copy.deepcopy(tts_templates.CARD)
-
-            # Determine the back url
-            if sheet_info["sheet_type"] == "single":
-                back_url = sheet_info["back_url"]
-            else:
-                back_url = self.resolve_back_url(arkham_id, data, translated_data)
-
-            # Build card data
-            new_card["GMNotes"] = '{"id":"' + arkham_id + '"}'
-            new_card["GUID"] = f"{self.cfg['locale']}_{arkham_id}"
-
-            # Name / Description
-            name_suffix = ""
-
-            # Append XP
-            xp = translated_data.get("xp", 0)
-            if xp > 0:
-                name_suffix += f" ({xp})"
-
-            # Append special suffix
-            for suffix, label in self.SUFFIX_MAP.items():
-                if arkham_id.endswith(suffix):
-                    name_suffix += f" {label}"
-                    break
-
-            new_card["Nickname"] = (
-                translated_data.get("name", translated_data.get("real_name", arkham_id))
-                + name_suffix
-            )
-            new_card["Description"] = translated_data.get("subname", "")
-
-            # Set SidewaysCard property if necessary
-            if translated_data.get("type_code") in {
-                "investigator",
-                "act",
-                "agenda",
-            } or arkham_id in {"85037", "85038"}:
-                new_card["SidewaysCard"] = True
-
-            # Image data
-            deck_id = data["deck_id"] + self.deck_offset
-            new_card["CardID"] = f"{deck_id}{data['card_id']:02}"
-            new_card["CustomDeck"] = {
-                str(deck_id): {
-                    "FaceURL": sheet_info["uploaded_url"],
-                    "BackURL": back_url,
-                    "NumWidth": sheet_info["grid_size"][1],
-                    "NumHeight": sheet_info["grid_size"][0],
-                    "BackIsHidden": True,
-                    "UniqueBack": data["double_sided"],
-                    "Type": 0,
-                }
-            }
-
             # Initialize nested dictionary structure (Category -> Cycle)
-            if data["category"] not in category_bags:
-                category_bags[data["category"]] = {}
-
-            if data["cycle_name"] not in category_bags[data["category"]]:
-                category_bags[data["category"]][data["cycle_name"]] = []
-
-            category_bags[data["category"]][data["cycle_name"]].append(new_card)
-
-        # Build individual bags for each cycle and add them to the master bag
-        master_contained_objects = []
-
-        # Sorting types guarantees they appear in a consistent order inside the master bag
-        for category in sorted(category_bags.keys()):
-            new_category_bag = copy.deepcopy(tts_templates.BAG)
-            new_category_bag["Nickname"] = category
-            new_category_bag["GUID"] = f"{self.cfg['locale']}_bag_{category}"
-
-            category_contained_bags = []
-
-            # Sort the cycles so bags are neatly ordered chronologically inside the category bag
-            for cycle_name in sorted(category_bags[category].keys()):
-                new_cycle_bag = copy.deepcopy(tts_templates.BAG)
-                new_cycle_bag["Nickname"] = f"{cycle_name}"
-                new_cycle_bag["GUID"] = (
-                    f"{self.cfg['locale']}_bag_{category}_{cycle_name}".replace(" ", "")
-                )
-                new_cycle_bag["ContainedObjects"] = category_bags[category][cycle_name]
-                category_contained_bags.append(new_cycle_bag)
-
-            new_category_bag["ContainedObjects"] = category_contained_bags
-            master_contained_objects.append(new_category_bag)
+            cycles = category_bags.setdefault(data["category"], {})
+            cycles.setdefault(data["cycle_name"], []).append((arkham_id, data))
 
         # Set bag data
-        master_bag = copy.deepcopy(tts_templates.BAG)
+        locale = self.cfg["locale"]
         date_stamp = datetime.now().strftime("%Y-%m-%d")
-        bag_name = f"{date_stamp} - {self.cfg['locale'].upper()}"
-        master_bag["Nickname"] = bag_name
-        master_bag["GUID"] = f"{self.cfg['locale']}_bag"
-        master_bag["ContainedObjects"] = master_contained_objects
-
-        # Final export
+        bag_name = f"{date_stamp} - {locale.upper()}"
         out_name = f"{bag_name}.json"
+        indent = None if self.cfg.get("compact_json", False) else 2
 
-        saved_object = copy.deepcopy(tts_templates.SAVED_OBJECT)
-        saved_object["ObjectStates"] = [master_bag]
-        self._save_json(
-            saved_object,
+        # The bags are written as soon as their cards are created, so only the
+        # cards of one cycle are in memory at once
+        saved_object = dict(tts_templates.SAVED_OBJECT)
+        del saved_object["ObjectStates"]
+        shards = ShardWriter(
             os.path.join(
-                self.cfg["output_folder"],
-                out_name,
+                self.cfg["output_folder"], f"TranslationBag - {locale.upper()}"
             ),
+            self.cfg.get("shard_output", ""),
+            saved_object,
+            locale,
+            indent,
         )
+        with BagWriter(
+            os.path.join(self.cfg["output_folder"], out_name), indent
+        ) as out:
+            out.open(saved_object, "ObjectStates")
+            out.open(
+                tts_templates.new_bag(Nickname=bag_name, GUID=f"{locale}_bag"),
+                "ContainedObjects",
+            )
+
+            # Sorting types guarantees they appear in a consistent order inside the master bag
+            for category in sorted(category_bags.keys()):
+                category_bag = tts_templates.new_bag(
+                    Nickname=category, GUID=f"{locale}_bag_{category}"
+                )
+                out.open(category_bag, "ContainedObjects")
+                shards.start_category(category, category_bag)
+
+                # Sort the cycles so bags are neatly ordered chronologically inside the category bag
+                for cycle_name in sorted(category_bags[category].keys()):
+                    cards = [
+                        self._build_card(arkham_id, data)
+                        for arkham_id, data in category_bags[category][cycle_name]
+                    ]
+                    guid = f"{locale}_bag_{category}_{cycle_name}".replace(" ", "")
+                    cycle_bag = tts_templates.new_bag(
+                        Nickname=f"{cycle_name}", GUID=guid, ContainedObjects=cards
+                    )
+                    out.item(cycle_bag)
+                    shards.add_cycle(cycle_name, cycle_bag)
+                out.close()
+                shards.finish_category()
+
+            out.close()
+            out.close()
         print(f"Export complete: {out_name}")
+        shards.finish()
+
+    def _build_card(self, arkham_id, data):
+        """Returns the TTS object of a card."""
+        sheet_info = self.sheet_parameters[data["deck_id"]]
+
+        # Names and flags from the arkham.build data with translated fields
+        meta = self.card_meta.get(arkham_id)
+
+        # Determine the back url
+        if sheet_info["sheet_type"] == "single":
+            back_url = sheet_info["back_url"]
+        else:
+            back_url = self.resolve_back_url(arkham_id, data)
+
+        # Build card data
+        new_card = tts_templates.new_card(
+            GMNotes='{"id":"' + arkham_id + '"}',
+            GUID=f"{self.cfg['locale']}_{arkham_id}",
+            Nickname=meta.name,
+            Description=meta.subname,
+        )
+
+        # Set SidewaysCard property if necessary
+        if meta.sideways:
+            new_card["SidewaysCard"] = True
+
+        # Image data
+        deck_id = data["deck_id"] + self.deck_offset
+        new_card["CardID"] = f"{deck_id}{data['card_id']:02}"
+        new_card["CustomDeck"] = {
+            str(deck_id): {
+                "FaceURL": sheet_info["uploaded_url"],
+                "BackURL": back_url,
+                "NumWidth": sheet_info["grid_size"][1],
+                "NumHeight": sheet_info["grid_size"][0],
+                "BackIsHidden": True,
+                "UniqueBack": data["double_sided"],
+                "Type": 0,
+            }
+        }
+        return new_card
+
+    def run(self):
+        """Runs all steps of a build."""
+        steps = [self.load_card_data, self.ensure_temp_path]
+
+        # Check the source images before anything is uploaded
+        steps += [self.scan_source, self.preflight_check]
+
+        if self.cfg["upload"]:
+            steps.append(self.load_remote_index)
+        steps += [
+            self.handle_local_backs,
+            self.load_build_manifest,
+            self.organize_sheets,
+            self.process_images,
+            self.build_tts_json,
+            self.save_build_manifest,
+        ]
+
+        self.tracer.start()
+        try:
+            for step in steps:
+                with self.tracer.span(step.__name__, "step"):
+                    step()
+        finally:
+            self.save_trace()
+
+    def save_trace(self):
+        """Writes the recorded timings and prints the totals per stage."""
+        if not self.tracer.enabled:
+            return
+
+        self.tracer.stop()
+        chrome_path = self.tracer.save(self.cfg["trace_file"])
+        print(f"[INFO]     Trace saved: {self.cfg['trace_file']} ({chrome_path})")
+
+        stages = self.tracer.summary()["stages"]
+        for name, stage in sorted(stages.items(), key=lambda s: -s[1]["wall"]):
+            print(
+                f"[INFO]     {name:<22}{stage['count']:>6}x "
+                f"{stage['wall']:>8.2f}s wall {stage['cpu']:>8.2f}s CPU "
+                f"{stage['bytes'] / 1024**2:>8.1f} MB"
+            )
 
 
 # --- Execution ---
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Headless mode
+        from modules import cli
+
+        sys.exit(cli.main(sys.argv[1:], TTSBundleProcessor))
+
+    from modules.gui import App, confirm
+
     gui = App()
     config = gui.get_values()
 
-    proc = TTSBundleProcessor(config)
-    proc.load_translation_data()
-    proc.load_english_data()
-    proc.ensure_temp_path()
-    proc.handle_local_backs()
-    proc.scan_source()
-    proc.organize_sheets()
-    proc.process_images()
-    proc.build_tts_json()
+    proc = TTSBundleProcessor(config, confirm=confirm)
+    proc.run()
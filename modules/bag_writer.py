@@ -0,0 +1,193 @@
+import filecmp
+import json
+import os
+
+from modules import tts_templates
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, the standard library encoder gives the same output
+    orjson = None
+
+
+def encode(value, indent=2, level=0):
+    """
+    Returns value as JSON, formatted as if it was nested level deep in an
+    indented document (indent=None = compact).
+    """
+    if orjson is not None and indent in (None, 2):
+        text = orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0)
+        text = text.decode()
+    elif indent:
+        text = json.dumps(value, ensure_ascii=False, indent=indent)
+    else:
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    # Strings can't contain raw line breaks, so every one starts a new line
+    if indent and level:
+        text = text.replace("\n", "\n" + " " * (indent * level))
+    return text
+
+
+class BagWriter:
+    """
+    Writes nested objects to a JSON file while their contents are produced,
+    e.g. a saved object with one bag per category and one per cycle, so the
+    whole tree never has to be in memory.
+
+    open() starts an object whose last key is a list, item() adds a complete
+    value to the innermost open list and close() ends it. The output is the
+    same as json.dump() of the whole tree with the same indent.
+    """
+
+    def __init__(self, path, indent=2, only_changed=False):
+        """only_changed: keep the existing file if the output is the same."""
+        self.path = path
+        self.indent = indent
+        self.only_changed = only_changed
+        self.tmp_path = f"{path}.tmp"
+        self.file = None
+        self.changed = True
+
+        # One entry per open object: whether its list has items yet
+        self.stack = []
+
+    def __enter__(self):
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.file.close()
+        if exc_type is not None:
+            os.remove(self.tmp_path)
+            return False
+
+        # An unchanged file isn't touched, so it isn't loaded or synced again
+        if (
+            self.only_changed
+            and os.path.exists(self.path)
+            and filecmp.cmp(self.tmp_path, self.path, shallow=False)
+        ):
+            self.changed = False
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, self.path)
+        return False
+
+    def _newline(self, level):
+        return "\n" + " " * (self.indent * level) if self.indent else ""
+
+    def _start_value(self):
+        """Writes the separator before a value in the innermost open list."""
+        if not self.stack:
+            return
+        if self.stack[-1]:
+            self.file.write(",")
+        self.stack[-1] = True
+        self.file.write(self._newline(len(self.stack) * 2))
+
+    def open(self, fields, list_key):
+        """Starts an object with fields, followed by an open list under list_key."""
+        self._start_value()
+        level = len(self.stack) * 2
+        separator = ": " if self.indent else ":"
+
+        self.file.write("{")
+        for key, value in fields.items():
+            self.file.write(self._newline(level + 1) + encode(key) + separator)
+            self.file.write(encode(value, self.indent, level + 1) + ",")
+        self.file.write(self._newline(level + 1) + encode(list_key) + separator + "[")
+        self.stack.append(False)
+
+    def item(self, value):
+        """Adds a complete value to the innermost open list."""
+        self._start_value()
+        self.file.write(encode(value, self.indent, len(self.stack) * 2))
+
+    def close(self):
+        """Ends the innermost open list and its object."""
+        has_items = self.stack.pop()
+        level = len(self.stack) * 2
+        if has_items:
+            self.file.write(self._newline(level + 1))
+        self.file.write("]" + self._newline(level) + "}")
+
+
+class ShardWriter:
+    """
+    Writes parts of the bag as saved objects of their own: one per category
+    ("<category>.json") and/or one per cycle ("<category> - <cycle>.json"),
+    with the same nesting and GUIDs as the full bag. Unchanged shards keep
+    their file, and shards of categories or cycles that are gone are removed.
+    """
+
+    def __init__(self, folder, mode, saved_object, locale, indent=2):
+        """mode: "category", "cycle", "both" or "" (no shards)."""
+        self.folder = folder
+        self.categories = mode in ("category", "both")
+        self.cycles = mode in ("cycle", "both")
+        self.saved_object = saved_object
+        self.locale = locale
+        self.indent = indent
+        self.written = []
+        self.unchanged = []
+
+        self.category = None
+        self.category_bag = None
+        self.cycle_bags = []
+
+    def start_category(self, category, category_bag):
+        """category_bag: the fields of the category bag, without its contents."""
+        self.category = category
+        self.category_bag = category_bag
+        self.cycle_bags = []
+
+    def add_cycle(self, cycle_name, cycle_bag):
+        if self.cycles:
+            self._write(f"{self.category} - {cycle_name}", [cycle_bag])
+        if self.categories:
+            self.cycle_bags.append(cycle_bag)
+
+    def finish_category(self):
+        if self.categories:
+            self._write(self.category, self.cycle_bags)
+        self.cycle_bags = []
+
+    def finish(self):
+        """Removes old shards and prints what was written."""
+        if not (self.categories or self.cycles):
+            return
+
+        # The folder only exists once a shard was written (e.g. not for an empty bag)
+        names = {f"{name}.json" for name in self.written + self.unchanged}
+        if os.path.isdir(self.folder):
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith(".json") and entry.name not in names:
+                    os.remove(entry.path)
+
+        print(
+            f"[INFO]     Shards: {len(self.written)} written, "
+            f"{len(self.unchanged)} unchanged in {self.folder}"
+        )
+
+    def _write(self, name, cycle_bags):
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{name}.json")
+        with BagWriter(path, self.indent, only_changed=True) as out:
+            out.open(self.saved_object, "ObjectStates")
+            out.open(
+                tts_templates.new_bag(
+                    Nickname=f"{self.locale.upper()} - {name}",
+                    GUID=f"{self.locale}_bag",
+                ),
+                "ContainedObjects",
+            )
+            out.open(self.category_bag, "ContainedObjects")
+            for cycle_bag in cycle_bags:
+                out.item(cycle_bag)
+            out.close()
+            out.close()
+            out.close()
+
+        (self.written if out.changed else self.unchanged).append(name)
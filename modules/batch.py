@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.memory import MemoryBudget
+from modules.pipeline import Pipeline
+
+
+class BatchBuilder:
+    """
+    Builds several locales in one process and shares the work between them.
+
+    The English card data is loaded once, all sheets of all locales go through
+    one pipeline with shared decode and upload pools, and processed images are
+    cached by content, so files that are the same in every language (e.g. the
+    'Tarot' folder) are only decoded once.
+    """
+
+    def __init__(self, cfg, locales, processor_class, confirm=None):
+        """
+        cfg: settings as in config.json, "{locale}" in the source folder is
+        replaced by each locale (e.g. "Arkham Cards - {locale}").
+        """
+        self.cfg = cfg
+        self.locales = locales
+        self.processors = [
+            processor_class(
+                {
+                    **cfg,
+                    "locale": locale,
+                    "source_folder": cfg["source_folder"].replace("{locale}", locale),
+                    # Share results between identical files in different trees
+                    "cache_hash_content": True,
+                },
+                confirm=confirm,
+            )
+            for locale in locales
+        ]
+
+    def run(self):
+        procs = self.processors
+        first = procs[0]
+
+        # One trace for all locales
+        tracer = first.tracer
+        for proc in procs:
+            proc.tracer = tracer
+
+        tracer.start()
+        try:
+            self._run()
+        finally:
+            first.save_trace()
+
+    def _run(self):
+        procs = self.processors
+        first = procs[0]
+        tracer = first.tracer
+
+        with tracer.span("load_card_data", "step"):
+            self.load_card_data()
+
+        # The temp folder is shared, so it's only reset once
+        first.ensure_temp_path()
+
+        # Check the source images of all locales before anything is uploaded
+        for proc in procs:
+            print(f"--- {proc.locale.upper()} ---")
+            with tracer.span("scan_source", "step", locale=proc.locale):
+                proc.scan_source()
+            with tracer.span("preflight_check", "step", locale=proc.locale):
+                proc.preflight_check()
+
+        for proc in procs:
+            print(f"--- {proc.locale.upper()} ---")
+            with tracer.span("organize_sheets", "step", locale=proc.locale):
+                if proc.cfg["upload"]:
+                    proc.load_remote_index()
+                proc.handle_local_backs()
+                proc.load_build_manifest()
+                proc.organize_sheets()
+
+        # One pipeline for everything, with the pools and caches of the first processor
+        decode_pool = ThreadPoolExecutor(self.cfg.get("decode_workers") or None)
+        memory_budget = MemoryBudget(self.cfg.get("memory_budget_mb", 2048) * 1024**2)
+        for proc in procs:
+            proc.decode_pool = decode_pool
+            proc.memory_budget = memory_budget
+            # The own uploader of a processor is only needed for its backs
+            if proc.uploader is not first.uploader:
+                if proc.uploader:
+                    proc.uploader.shutdown()
+                proc.uploader = first.uploader
+            proc.sheet_cache = first.sheet_cache
+            proc.card_cache = first.card_cache
+
+        stages_by_proc = {proc: proc.get_pipeline_stages() for proc in procs}
+        stages = [
+            (name, self._dispatch(index, stages_by_proc), workers)
+            for index, (name, _, workers) in enumerate(stages_by_proc[first])
+        ]
+        jobs = [(proc, job) for proc in procs for job in proc.get_sheet_jobs()]
+
+        try:
+            # Sheets that are identical to an earlier one (e.g. Tarot in every
+            # language) run after it, so they are taken from the sheet cache
+            with tracer.span("process_images", "step"):
+                for pass_jobs in self._split_duplicates(jobs):
+                    Pipeline(stages, self.cfg.get("pipeline_queue_size", 2)).run(
+                        pass_jobs
+                    )
+        finally:
+            decode_pool.shutdown()
+            first.finish_uploads()
+            first.print_memory_report()
+
+        for proc in procs:
+            with tracer.span("build_tts_json", "step", locale=proc.locale):
+                proc.build_tts_json()
+                proc.save_build_manifest()
+
+    def load_card_data(self):
+        """Loads the English data once and all translations in parallel."""
+        procs = self.processors
+
+        # An English build takes its translation from the English data
+        english = next((proc for proc in procs if proc.locale == "en"), procs[0])
+
+        with ThreadPoolExecutor(len(procs) + 1) as executor:
+            futures = [
+                executor.submit(
+                    english.load_english_data, translation=english.locale == "en"
+                )
+            ]
+            futures += [
+                executor.submit(proc.load_translation_data)
+                for proc in procs
+                if proc.locale != "en"
+            ]
+            for future in futures:
+                future.result()
+
+        for proc in procs:
+            proc.english_data = english.english_data
+            if proc.locale == "en":
+                proc.translation_data = english.translation_data
+
+    @staticmethod
+    def _split_duplicates(jobs):
+        """Splits jobs into unique sheets and sheets with the same content."""
+        unique, duplicates = [], []
+        seen = set()
+        for proc, (online_name, data) in jobs:
+            key = None
+            if proc.sheet_cache:
+                key = proc._sheet_content_key(data, proc._get_card_size(data))
+
+            if key and key in seen:
+                duplicates.append((proc, (online_name, data)))
+            else:
+                seen.add(key)
+                unique.append((proc, (online_name, data)))
+        return [unique, duplicates]
+
+    @staticmethod
+    def _dispatch(index, stages_by_proc):
+        """Returns a stage function that runs the stage of the job's processor."""
+
+        def run_stage(item):
+            proc, job = item
+            result = stages_by_proc[proc][index][1](job)
+            return None if result is None else (proc, result)
+
+        return run_stage
@@ -0,0 +1,99 @@
+import json
+import os
+import time
+
+MANIFEST_VERSION = 1
+
+
+class BuildManifest:
+    """
+    Records what a build produced: the source fingerprint and sheet of every
+    card, the content key and URL of every sheet and the settings that shaped
+    them. The next build compares against it to only re-render and re-upload
+    the sheets that changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cards = {}
+        self.sheets = {}
+        self.files = []
+        self.settings = {}
+
+    def load(self):
+        """Loads the manifest of the previous build. Returns False if there is none."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading build manifest, rebuilding everything: {e}")
+            return False
+
+        if manifest.get("version") != MANIFEST_VERSION:
+            return False
+
+        self.cards = manifest.get("cards", {})
+        self.sheets = manifest.get("sheets", {})
+        self.files = manifest.get("files", [])
+        self.settings = manifest.get("settings", {})
+        return True
+
+    def save(self, cards, sheets, files, settings):
+        """
+        cards: arkham_id -> {"fingerprint", "sheet"}
+        sheets: online name -> {"content_key", "url", "id_list"}
+        files: scanned image paths relative to the source folder
+        settings: the settings of the build that the next one has to compare
+        """
+        self.cards = cards
+        self.sheets = sheets
+        self.files = files
+        self.settings = settings
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "created": time.time(),
+                    "cards": cards,
+                    "sheets": sheets,
+                    "files": files,
+                    "settings": settings,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+
+    def diff_cards(self, fingerprints):
+        """Returns the (changed, added, removed) card IDs compared to fingerprints."""
+        changed = [
+            arkham_id
+            for arkham_id, fingerprint in fingerprints.items()
+            if arkham_id in self.cards
+            and self.cards[arkham_id]["fingerprint"] != fingerprint
+        ]
+        added = [arkham_id for arkham_id in fingerprints if arkham_id not in self.cards]
+        removed = [
+            arkham_id for arkham_id in self.cards if arkham_id not in fingerprints
+        ]
+        return changed, added, removed
+
+    def get_sheet(self, online_name):
+        return self.sheets.get(online_name)
+
+    def card_sheets(self):
+        """Returns the sheet of every card in the previous build."""
+        return {
+            arkham_id: online_name
+            for online_name, sheet in self.sheets.items()
+            for arkham_id in sheet["id_list"]
+        }
+
+    def count_changed_sheets(self, id_lists):
+        """Counts the planned sheets that don't hold the same cards as before."""
+        previous = {tuple(sheet["id_list"]) for sheet in self.sheets.values()}
+        return sum(1 for id_list in id_lists if tuple(id_list) not in previous)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+
+# Bump this to invalidate all cache entries when the rendering changes
+CACHE_VERSION = 1
+
+# Temporary files older than this (in seconds) are from interrupted writes
+TMP_MAX_AGE = 3600
+
+
+# Content hashes of the files seen in this process, by path, size and mtime
+_content_hashes = {}
+
+
+def file_fingerprint(path, hash_content=False):
+    """Identifies a file by its content hash or by its path, size and mtime."""
+    stat = os.stat(path)
+    identity = f"{os.path.abspath(path)}:{stat.st_size}-{stat.st_mtime_ns}"
+    if not hash_content:
+        return identity
+
+    if identity not in _content_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _content_hashes[identity] = digest.hexdigest()
+    return _content_hashes[identity]
+
+
+def make_key(*parts):
+    """Hashes JSON-serializable parts into a cache key."""
+    payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskCache:
+    """
+    A directory of files named by their key, capped in total size.
+    Entries are evicted least-recently-used first; the file mtime is used as
+    the last access time, so the order survives between runs.
+    """
+
+    def __init__(self, path, max_mb, suffix=""):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        os.makedirs(self.path, exist_ok=True)
+        for entry in os.scandir(self.path):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith(".tmp"):
+                # Left over from an interrupted write (recent ones may still be
+                # written by another build that shares the cache)
+                if time.time() - stat.st_mtime > TMP_MAX_AGE:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+            elif entry.name.endswith(self.suffix):
+                self.entries[entry.name] = [stat.st_size, stat.st_mtime]
+        self.total_bytes = sum(size for size, _ in self.entries.values())
+
+    def _file_name(self, key):
+        return f"{key}{self.suffix}"
+
+    def get(self, key):
+        """Returns the path of a cached entry (and marks it as used) or None."""
+        file_name = self._file_name(key)
+        with self.lock:
+            if file_name not in self.entries:
+                return None
+
+            path = os.path.join(self.path, file_name)
+            try:
+                os.utime(path)
+            except OSError:
+                # Removed from outside
+                self.total_bytes -= self.entries.pop(file_name)[0]
+                return None
+
+            self.entries[file_name][1] = os.path.getmtime(path)
+            return path
+
+    def put(self, key, src_path):
+        """Copies a file into the cache."""
+        with open(src_path, "rb") as f:
+            self.put_bytes(key, f.read())
+
+    def put_bytes(self, key, data):
+        """Stores bytes in the cache and evicts old entries if necessary."""
+        if len(data) > self.max_bytes:
+            return
+
+        file_name = self._file_name(key)
+        path = os.path.join(self.path, file_name)
+
+        # Write to a temporary file first so readers never see partial entries
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if file_name in self.entries:
+                self.total_bytes -= self.entries[file_name][0]
+            self.entries[file_name] = [len(data), os.path.getmtime(path)]
+            self.total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        """Removes least-recently-used entries until the cache fits its budget."""
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        for file_name, (size, _) in sorted(
+            self.entries.items(), key=lambda entry: entry[1][1]
+        ):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.path, file_name))
+            except FileNotFoundError:
+                # Removed from outside
+                pass
+            except OSError:
+                # Still in use (e.g. memory-mapped on Windows), try again later
+                continue
+            del self.entries[file_name]
+            self.total_bytes -= size
+
+
+class SheetCache(DiskCache):
+    """Encoded sheets, keyed by a hash of everything that goes into them."""
+
+    def __init__(self, path, max_mb):
+        super().__init__(path, max_mb, suffix=".webp")
+
+    def copy_to(self, key, dest_path):
+        """Copies a cached sheet to dest_path. Returns False on a cache miss."""
+        path = self.get(key)
+        if not path:
+            return False
+        try:
+            shutil.copyfile(path, dest_path)
+        except FileNotFoundError:
+            # Evicted in the meantime
+            return False
+        return True
+
+
+class CardCache(DiskCache):
+    """
+    Processed card bitmaps as raw RGB, so they can be memory-mapped instead
+    of being decoded and resized again.
+    """
+
+    def __init__(self, path, max_mb):
+        super().__init__(path, max_mb, suffix=".rgb")
+
+    def load(self, key, size):
+        """Returns a memory-mapped RGB image of the given size or None."""
+        path = self.get(key)
+        if not path:
+            return None
+
+        # Late import, PIL is only needed when images are processed
+        from PIL import Image
+
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if len(buffer) != size[0] * size[1] * 3:
+            buffer.close()
+            return None
+
+        # The image keeps a reference to the mapping and reads from it directly
+        return Image.frombuffer("RGB", size, buffer, "raw", "RGB", 0, 1)
+
+    def store(self, key, image):
+        self.put_bytes(key, image.tobytes())
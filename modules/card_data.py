@@ -0,0 +1,180 @@
+import codecs
+import json
+import os
+import re
+import tempfile
+import time
+
+CHUNK_SIZE = 256 * 1024
+
+
+def iter_json_array(chunks, key):
+    """
+    Yields the items of the first JSON array stored under key, parsing the
+    byte chunks as they arrive instead of loading the whole document.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    key_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    buffer = ""
+    pos = None
+    chunks = iter(chunks)
+
+    def read_more():
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"Unexpected end of data while reading '{key}'")
+        return text_decoder.decode(chunk)
+
+    # Find the start of the array
+    while pos is None:
+        buffer += read_more()
+        match = key_pattern.search(buffer)
+        if match:
+            pos = match.end()
+        else:
+            # Keep enough for a key that is split between chunks
+            buffer = buffer[-(len(key) + 64) :]
+
+    while True:
+        # Skip separators between items
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = read_more(), 0
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The item is incomplete, drop what was consumed and read on
+            buffer = buffer[pos:] + read_more()
+            pos = 0
+            continue
+
+        yield item
+        pos = end
+
+
+class CardDataCache:
+    """
+    Local copies of the arkham.build card payloads.
+
+    Cached payloads are revalidated with conditional requests (ETag /
+    If-Modified-Since), so unchanged data costs a single round trip. In
+    offline mode the cached copy is used without any request.
+    """
+
+    def __init__(self, path, offline=False, max_age=0, timeout=60):
+        """max_age: seconds a cached payload is used without revalidating it."""
+        self.path = path
+        self.offline = offline
+        self.max_age = max_age
+        self.timeout = timeout
+
+    def _paths(self, name):
+        return (
+            os.path.join(self.path, f"{name}.json"),
+            os.path.join(self.path, f"{name}.meta.json"),
+        )
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def _write_meta(self, meta_path, meta):
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def iter_chunks(self, name, url):
+        """
+        Yields the payload at url as byte chunks. A downloaded payload is
+        written to the cache while it is being read.
+        """
+        data_path, meta_path = self._paths(name)
+        meta = self._read_meta(meta_path) if os.path.exists(data_path) else {}
+
+        if self.offline:
+            if not meta:
+                raise RuntimeError(f"No cached copy of '{name}' for offline mode")
+            yield from self._iter_file(data_path)
+            return
+
+        if meta and time.time() - meta.get("fetched", 0) < self.max_age:
+            yield from self._iter_file(data_path)
+            return
+
+        # Late import, requests is only needed when going online
+        import requests
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = requests.get(
+                url, headers=headers, stream=True, timeout=self.timeout
+            )
+            response.raise_for_status()
+        except Exception as e:
+            if not meta:
+                raise
+            print(f"[WARNING] Fetching {url} failed, using cached copy: {e}")
+            yield from self._iter_file(data_path)
+            return
+
+        with response:
+            if response.status_code == 304:
+                print(f"[INFO]     {name} card data is unchanged")
+                meta["fetched"] = time.time()
+                self._write_meta(meta_path, meta)
+                yield from self._iter_file(data_path)
+                return
+
+            # Pass the body on while streaming it to disk
+            # (each download has its own temp file, so concurrent ones can't clash)
+            os.makedirs(self.path, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f"{name}.", suffix=".tmp", dir=self.path
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        yield chunk
+                os.replace(tmp_path, data_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+            self._write_meta(
+                meta_path,
+                {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched": time.time(),
+                },
+            )
+
+    def _iter_file(self, path):
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+    def iter_cards(self, name, url):
+        """Yields the card dicts of the payload at url one by one."""
+        chunks = self.iter_chunks(name, url)
+        yield from iter_json_array(chunks, "all_card")
+
+        # Read the rest, so a download is stored completely
+        for _ in chunks:
+            pass
@@ -0,0 +1,115 @@
+import re
+from collections import namedtuple
+
+# Normalized metadata of a card:
+# clean_id: the ID of its card data (without parallel, Taboo and upgrade sheet suffixes)
+# name: display name with the XP and the suffix label, e.g. "Machete (Taboo)"
+# size_class: key of CARD_SIZES ("Regular", "Mini" or "Tarot")
+# back_type: key of BACK_URLS for cards that aren't double-sided
+# data: the card data from arkham.build ({} if unknown)
+CardMeta = namedtuple(
+    "CardMeta",
+    [
+        "clean_id",
+        "name",
+        "subname",
+        "sideways",
+        "size_class",
+        "back_type",
+        "alternate_of",
+        "data",
+    ],
+)
+
+# Suffixes of cards that share the data of the base card
+CLEAN_ID_PATTERN = re.compile(r"-(p[fb]|[tcp])$")
+
+# Backs whose cards don't have the regular size
+SIZE_CLASSES = {"Tarot": "Tarot", "Concealed": "Mini"}
+
+SIDEWAYS_TYPES = {"investigator", "act", "agenda"}
+SIDEWAYS_IDS = {"85037", "85038"}
+
+
+class CardMetaResolver:
+    """
+    Computes the metadata of every card once, so sorting, grouping and
+    building the bag look it up instead of parsing IDs and card data again.
+    """
+
+    def __init__(self, find_data, suffix_map, special_ids):
+        """
+        find_data(clean_id) returns the card data of an ID ({} if unknown).
+        suffix_map: ID suffix -> label added to the name.
+        special_ids: ID -> back type of cards with special backs.
+        """
+        self.find_data = find_data
+        self.suffix_map = suffix_map
+        self.special_ids = special_ids
+        self.cache = {}
+
+    def get(self, arkham_id):
+        meta = self.cache.get(arkham_id)
+        if meta is None:
+            meta = self.cache[arkham_id] = self._resolve(arkham_id)
+        return meta
+
+    def _resolve(self, arkham_id):
+        clean_id = CLEAN_ID_PATTERN.sub("", arkham_id)
+        data = self.find_data(clean_id)
+
+        # Name / Description
+        name_suffix = ""
+
+        # Append XP
+        xp = data.get("xp", 0)
+        if xp > 0:
+            name_suffix += f" ({xp})"
+
+        # Append special suffix
+        for suffix, label in self.suffix_map.items():
+            if arkham_id.endswith(suffix):
+                name_suffix += f" {label}"
+                break
+
+        back_type = self._back_type(arkham_id, data)
+        return CardMeta(
+            clean_id=clean_id,
+            name=data.get("name", data.get("real_name", arkham_id)) + name_suffix,
+            subname=data.get("subname", ""),
+            sideways=data.get("type_code") in SIDEWAYS_TYPES
+            or arkham_id in SIDEWAYS_IDS,
+            size_class=SIZE_CLASSES.get(back_type, "Regular"),
+            back_type=back_type,
+            alternate_of=data.get("alternate_of_code"),
+            data=data,
+        )
+
+    def _back_type(self, arkham_id, data):
+        # Check for suffix (Upgradesheets from TSK)
+        if arkham_id.endswith("-c"):
+            return "Upgradesheet"
+
+        # Check for prefix (Concealed cards from TSK)
+        if arkham_id.startswith("HC"):
+            return "Concealed"
+
+        # Check for prefix (Tarot cards from RtTCU)
+        if arkham_id.startswith("TAR"):
+            return "Tarot"
+
+        # Check specific ID lists
+        special_type = self.special_ids.get(arkham_id)
+        if special_type:
+            return special_type
+
+        # Check for deck limit (Player Cards including bonded [deck_limit = 0])
+        if "deck_limit" in data:
+            return "Player"
+
+        # Check for encounter code (Encounter Cards)
+        if "encounter_code" in data:
+            return "Encounter"
+
+        # Final Fallback
+        return "Player"
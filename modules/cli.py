@@ -0,0 +1,154 @@
+import argparse
+import os
+
+from modules.settings import CONFIG_PATH, DEFAULTS, load_config
+
+
+def build_parser():
+    """Creates the argument parser with one flag per setting from config.json."""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Creates the TTS translation bag without the GUI. "
+        "Run without arguments to open the GUI instead.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in [
+        ("build", "run the full build (the same as submitting the GUI)"),
+        ("plan", "scan the source folder and print the planned sheets"),
+        ("data", "only fetch (or refresh) the card data"),
+        ("check", "check all source images without building"),
+        ("batch", "build several locales in one run with shared work"),
+        ("serve", 'serve the local store (storage "local") over HTTP'),
+    ]:
+        sub = commands.add_parser(command, help=help_text)
+        if command == "batch":
+            sub.add_argument(
+                "locales",
+                nargs="+",
+                help='locales to build, "{locale}" in the source folder is replaced by each',
+            )
+        sub.add_argument(
+            "--config",
+            default=CONFIG_PATH,
+            help="settings file to start from (default: config.json next to main.py)",
+        )
+
+        if command in ("build", "batch"):
+            sub.add_argument(
+                "--reset-temp",
+                action="store_true",
+                help="reset an existing temp folder without asking",
+            )
+
+        # Every setting can be overridden by a flag
+        settings = sub.add_argument_group("settings")
+        for key, default in DEFAULTS.items():
+            flag = "--" + key.replace("_", "-")
+            if isinstance(default, bool):
+                settings.add_argument(
+                    flag, dest=key, action=argparse.BooleanOptionalAction
+                )
+            else:
+                settings.add_argument(
+                    flag, dest=key, type=type(default), metavar=key.upper()
+                )
+
+    return parser
+
+
+def get_config(args):
+    """Merges the config file with the settings given as flags."""
+    cfg = load_config(args.config)
+    for key in DEFAULTS:
+        value = getattr(args, key)
+        if value is not None:
+            cfg[key] = value
+    cfg["reset_temp"] = getattr(args, "reset_temp", False)
+    return cfg
+
+
+def print_plan(proc):
+    """Prints one line per planned sheet."""
+    for d_id, data in proc.sheet_parameters.items():
+        rows, cols = data["grid_size"]
+        print(
+            f"{d_id:>4}  {data['sheet_type']:<6}  {data['card_count']:>3} cards  "
+            f"{cols:>2}x{rows}  {data['start_id']} - {data['end_id']}"
+        )
+    card_count = sum(data["card_count"] for data in proc.sheet_parameters.values())
+    print(f"{len(proc.sheet_parameters)} sheets, {card_count} cards")
+
+
+def serve(cfg, processor_class):
+    """Serves the local store until Ctrl+C is pressed."""
+    from modules import storage
+
+    store = processor_class({**cfg, "upload": True, "storage": "local"}).storage
+    server = storage.serve(store)
+    print(f"Serving {store.objects_path} at {store.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv, processor_class):
+    """Runs a headless command and returns the exit code."""
+    args = build_parser().parse_args(argv)
+    cfg = get_config(args)
+
+    source_folders = [cfg["source_folder"]]
+    if args.command == "batch":
+        source_folders = [
+            cfg["source_folder"].replace("{locale}", locale) for locale in args.locales
+        ]
+
+    if args.command == "serve":
+        return serve(cfg, processor_class)
+
+    if args.command != "data":
+        for source_folder in source_folders:
+            if not os.path.isdir(source_folder):
+                print(f"[ERROR] Source folder does not exist: {source_folder}")
+                return 2
+
+    if args.command in ("build", "batch") and not os.path.isdir(cfg["output_folder"]):
+        print(f"[ERROR] Output folder does not exist: {cfg['output_folder']}")
+        return 2
+
+    if args.command == "batch":
+        from modules.batch import BatchBuilder
+
+        BatchBuilder(cfg, args.locales, processor_class).run()
+        return 0
+
+    # Nothing is uploaded unless the full build runs
+    if args.command != "build":
+        cfg["upload"] = False
+
+    proc = processor_class(cfg)
+    if args.command == "build":
+        proc.run()
+    elif args.command == "plan":
+        proc.load_card_data()
+        proc.scan_source()
+        proc.load_build_manifest()
+        proc.organize_sheets()
+        print_plan(proc)
+    elif args.command == "check":
+        proc.scan_source()
+        report = proc.preflight_check()
+        if report and report["errors"]:
+            return 1
+    elif args.command == "data":
+        proc.load_card_data()
+        print(
+            f"Loaded {len(proc.translation_data)} translated and "
+            f"{len(proc.english_data)} English cards"
+        )
+
+    return 0
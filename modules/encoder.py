@@ -0,0 +1,138 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.trace import NULL_TRACER
+
+# Scale factor of the trial encode used to predict the file size
+PREDICT_REDUCE = 4
+
+
+def encode_webp(image, quality, method=4):
+    """Encodes an image as WebP into memory and returns the bytes."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="WebP", quality=quality, method=method)
+    return buffer.getvalue()
+
+
+def quality_candidates(quality, min_quality=50, step=5):
+    """
+    Returns the qualities to try in descending order.
+    The last candidate is the first one at or below min_quality, which is
+    accepted regardless of its size.
+    """
+    candidates = [quality]
+    while candidates[-1] > min_quality:
+        candidates.append(candidates[-1] - step)
+    return candidates
+
+
+class QualitySearch:
+    """
+    Finds the highest WebP quality that keeps an image below a size limit.
+
+    All encodes happen in memory. The candidates are searched by bisection
+    (or with several probes per round if search_width > 1) instead of
+    stepping down one quality at a time, optionally starting from a guess
+    that is predicted from cheap encodes of a scaled-down copy.
+    """
+
+    def __init__(
+        self,
+        max_kb,
+        method=4,
+        search_width=1,
+        predict=True,
+        tracer=NULL_TRACER,
+        name="",
+    ):
+        """tracer records every encode attempt under name (e.g. the sheet)."""
+        self.max_kb = max_kb
+        self.method = method
+        self.search_width = max(1, search_width)
+        self.predict = predict
+        self.tracer = tracer
+        self.name = name
+
+    def encode(self, image, quality, stage="encode"):
+        with self.tracer.span(stage, "sheet", sheet=self.name, quality=quality) as span:
+            data = encode_webp(image, quality, self.method)
+            span.bytes = len(data)
+        return data
+
+    def fits(self, data):
+        return len(data) // 1024 < self.max_kb
+
+    def search(self, image, quality, min_quality=50):
+        """Returns a tuple of (bytes, quality, encode count)."""
+        candidates = quality_candidates(quality, min_quality)
+        results = {}
+
+        def probe(indices):
+            indices = [i for i in indices if i not in results]
+            if len(indices) > 1:
+                # Image.save() stores its options on the image, so parallel
+                # encodes need their own copy
+                images = [image] + [image.copy() for _ in indices[1:]]
+                with ThreadPoolExecutor(len(indices)) as executor:
+                    encoded = executor.map(
+                        lambda i, img: self.encode(img, candidates[i]),
+                        indices,
+                        images,
+                    )
+                    results.update(zip(indices, encoded))
+            elif indices:
+                results[indices[0]] = self.encode(image, candidates[indices[0]])
+
+        # Most sheets fit at the requested quality
+        probe([0])
+        if self.fits(results[0]) or len(candidates) == 1:
+            return results[0], candidates[0], len(results)
+
+        # Invariant: candidates[lo - 1] is too big, candidates[hi] is accepted
+        lo, hi = 1, len(candidates) - 1
+
+        if self.predict and hi > lo:
+            guess = self._predict(image, candidates, len(results[0]))
+            if guess is not None and lo <= guess < hi:
+                probe([guess])
+                if self.fits(results[guess]):
+                    hi = guess
+                else:
+                    lo = guess + 1
+
+        while lo < hi:
+            # Evenly spread probes over the remaining range
+            count = min(self.search_width, hi - lo)
+            indices = sorted(
+                {lo + (hi - lo) * (n + 1) // (count + 1) for n in range(count)}
+            )
+            probe(indices)
+
+            for i in indices:
+                if self.fits(results[i]):
+                    hi = i
+                    break
+                lo = i + 1
+
+        probe([hi])
+        return results[hi], candidates[hi], len(results)
+
+    def _predict(self, image, candidates, full_size):
+        """Estimates the first candidate that fits from a scaled-down trial encode."""
+        try:
+            small = image.reduce(PREDICT_REDUCE)
+        except (AttributeError, ValueError):
+            return None
+
+        small_size = len(self.encode(small, candidates[0], "encode_predict"))
+        if not small_size:
+            return None
+
+        # Scale the small sizes by the ratio observed at the starting quality,
+        # stopping at the first candidate that is predicted to fit
+        ratio = full_size / small_size
+        for i in range(1, len(candidates)):
+            size = len(self.encode(small, candidates[i], "encode_predict"))
+            if (size * ratio) // 1024 < self.max_kb:
+                return i
+        return len(candidates) - 1
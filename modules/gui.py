@@ -4,30 +4,20 @@ import json
 import os
 import sys
 
+from modules.settings import (
+    CONFIG_PATH,
+    DEFAULTS,
+    generate_default_output_path,
+    read_config_file,
+)
+
 
 class App:
     def __init__(self):
         """Initializes the UI by creating the elements"""
 
-        # Define absolute path for config file
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(script_dir)
-        self.config_path = os.path.join(parent_dir, "config.json")
-
-        self.DEFAULTS = {
-            "img_max_kb": 20_480,
-            "cloud_name": "-",
-            "api_key": "-",
-            "api_secret": "-",
-            "locale": "en",
-            "max_sheet_count": 999,
-            "output_folder": self.generate_default_output_path(),
-            "source_folder": "",
-            "upload": False,
-            "img_count_per_sheet": 30,
-            "img_quality": 90,
-            "img_contrast": 100,
-        }
+        self.config_path = CONFIG_PATH
+        self.DEFAULTS = DEFAULTS
 
         self.root = tk.Tk()
         self.root.protocol("WM_DELETE_WINDOW", self.close_app)
@@ -157,13 +147,9 @@ class App:
     def load_settings(self):
         """Loads settings from the config file"""
 
-        # Attempt to read and update self.cfg if the file actually exists
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, "r") as f:
-                    self.cfg.update(json.load(f))
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading config file, using defaults: {e}")
+        saved = read_config_file(self.config_path)
+        self.saved_keys = set(saved)
+        self.cfg = {**self.DEFAULTS, **saved}
 
         for _, var_name, expected_type in self.fields:
             value = self.cfg.get(var_name, "")
@@ -232,9 +218,27 @@ class App:
             # get values from checkboxes
             self.cfg["upload"] = bool(self.upload_var.get())
 
-            # save settings
+            # save the settings of the form and the ones that were saved before,
+            # so the other defaults aren't pinned in the config file
+            saved_keys = self.saved_keys | {var_name for _, var_name, _ in self.fields}
+            saved_keys |= {
+                "source_folder",
+                "output_folder",
+                "upload",
+                "img_count_per_sheet",
+                "img_quality",
+                "img_contrast",
+            }
             with open(self.config_path, "w") as f:
-                json.dump(self.cfg, f, indent=4)
+                json.dump(
+                    {
+                        key: value
+                        for key, value in self.cfg.items()
+                        if key in saved_keys
+                    },
+                    f,
+                    indent=4,
+                )
 
             # quit the GUI and continue with the main script
             self.root.quit()
@@ -262,31 +266,10 @@ class App:
         self.contrast_slider.set(100)
         self.update_label(self.contrast_label, 100)
 
-    def generate_default_output_path(self):
-        if sys.platform == "darwin":  # macOS
-            base_folder = os.path.join(
-                os.path.expanduser("~"),
-                "Library",
-            )
-        elif sys.platform == "linux":  # linux
-            base_folder = os.path.join(os.path.expanduser("~"), ".local", "share")
-        else:  # windows
-            base_folder = os.path.join(
-                os.environ["USERPROFILE"],
-                "Documents",
-                "My Games",
-            )
-        return os.path.join(
-            f"{base_folder}",
-            "Tabletop Simulator",
-            "Saves",
-            "Saved Objects",
-        ).replace("\\", "/")
-
     def set_default_output_folder(self):
         """Helper function to set output folder as default ('TTS/Saves/Saved Objects' folder)"""
         self.output_folder_entry.delete(0, tk.END)
-        self.output_folder_entry.insert(0, self.generate_default_output_path())
+        self.output_folder_entry.insert(0, generate_default_output_path())
 
     def update_label(self, label, value, step=1):
         """Helper function to update the label of a slider to its value"""
@@ -311,3 +294,8 @@ class App:
     def get_values(self):
         """Helper function to get the config values"""
         return self.cfg
+
+
+def confirm(title, message):
+    """Asks the user a yes/no question in a popup."""
+    return messagebox.askyesno(title=title, message=message)
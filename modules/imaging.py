@@ -0,0 +1,195 @@
+import os
+
+from PIL import Image
+
+from modules.trace import NULL_TRACER
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional, the contrast tables are then built in plain Python
+    np = None
+
+# Weights of R, G and B in a grayscale conversion
+L_WEIGHTS = (0.299, 0.587, 0.114)
+
+# Speed/quality tiers: (resampling filter, JPEG draft scale and pre-reduce gap
+# relative to the target size, None = decode and resample at full size)
+RESIZE_TIERS = {
+    "fast": (Image.Resampling.BILINEAR, 1.0),
+    "balanced": (Image.Resampling.LANCZOS, 2.0),
+    "best": (Image.Resampling.LANCZOS, None),
+}
+
+# Modes that are resized as they are (cheaper, or needed for correct transparency)
+RESIZE_MODES = {"RGB", "L", "RGBA", "LA"}
+
+
+def load_card(path, size, contrast=100, tier="best", tracer=NULL_TRACER, reserve=None):
+    """
+    Loads a card image, turns it upright and resizes it to size as RGB.
+    reserve(bytes) is called with the memory the decode needs before it
+    starts and returns a function that releases it.
+    """
+    resample, reduce_gap = RESIZE_TIERS[tier]
+    card = os.path.basename(path)
+    with Image.open(path) as img:
+        # Horizontal images are resized first and then rotated 90° clockwise
+        landscape = img.size[0] > img.size[1]
+        resize_to = (size[1], size[0]) if landscape else size
+
+        # Let the JPEG decoder scale down by up to 8x while decoding
+        if reduce_gap and img.format == "JPEG":
+            img.draft(
+                img.mode,
+                (int(resize_to[0] * reduce_gap), int(resize_to[1] * reduce_gap)),
+            )
+
+        # Wait until the decode fits into the memory budget
+        release = reserve(decode_memory(img, size)) if reserve else None
+        try:
+            with tracer.span("decode", "card", card=card) as span:
+                span.bytes = os.path.getsize(path)
+                img.load()
+
+                # Palette and other modes would be resized badly or slowly
+                if img.mode not in RESIZE_MODES:
+                    img = img.convert("RGB")
+
+            # Resize (other formats are reduced with a box filter first) and convert to RGB
+            with tracer.span("resize", "card", card=card):
+                img = img.resize(resize_to, resample, reducing_gap=reduce_gap).convert(
+                    "RGB"
+                )
+                if landscape:
+                    img = img.transpose(Image.Transpose.ROTATE_270)
+
+            if contrast != 100:
+                with tracer.span("contrast", "card", card=card):
+                    img = adjust_contrast(img, contrast / 100)
+
+            return img
+        finally:
+            if release:
+                release()
+
+
+def decode_memory(img, size):
+    """
+    Estimates the bytes of an opened (not yet loaded) image while it is
+    decoded and resized to size, from its header and draft scale.
+    """
+    pixels = img.size[0] * img.size[1]
+    decoded = pixels * len(img.getbands())
+    if img.mode not in RESIZE_MODES:
+        decoded += pixels * 3
+
+    # The resized copy and its RGB and upright versions
+    return decoded + size[0] * size[1] * 3 * 2
+
+
+def _autocontrast_lut(histogram, cutoff):
+    """The lookup table of ImageOps.autocontrast for the 256 bins of one band."""
+    h = list(histogram)
+    n = sum(h)
+
+    # Cut off pixels from both ends of the histogram
+    cut = n * cutoff // 100
+    for lo in range(256):
+        removed = min(cut, h[lo])
+        h[lo] -= removed
+        cut -= removed
+        if cut <= 0:
+            break
+    cut = n * cutoff // 100
+    for hi in range(255, -1, -1):
+        removed = min(cut, h[hi])
+        h[hi] -= removed
+        cut -= removed
+        if cut <= 0:
+            break
+
+    # Find the lowest and highest remaining values
+    lo = next((i for i in range(256) if h[i]), 0)
+    hi = next((i for i in range(255, -1, -1) if h[i]), 0)
+    if hi <= lo:
+        return list(range(256))
+
+    scale = 255.0 / (hi - lo)
+    offset = -lo * scale
+    return [min(max(int(i * scale + offset), 0), 255) for i in range(256)]
+
+
+def contrast_lut(histogram, factor, cutoff=1):
+    """
+    Returns one lookup table for ImageOps.autocontrast(cutoff) followed by
+    ImageEnhance.Contrast(factor), computed from the histogram of an RGB image.
+    """
+    if np is None:
+        luts = [
+            _autocontrast_lut(histogram[band * 256 : band * 256 + 256], cutoff)
+            for band in range(3)
+        ]
+        counts = histogram[:256]
+        n = sum(counts) or 1
+        band_means = [
+            sum(c * v for c, v in zip(histogram[b * 256 : b * 256 + 256], luts[b])) / n
+            for b in range(3)
+        ]
+        mean = int(sum(w * m for w, m in zip(L_WEIGHTS, band_means)) + 0.5)
+        return [
+            min(max(int(mean + factor * (v - mean)), 0), 255)
+            for lut in luts
+            for v in lut
+        ]
+
+    # Every band at once: the cutoffs are found on the cumulative histograms
+    hist = np.asarray(histogram, dtype=np.int64).reshape(3, 256)
+    n = hist.sum(axis=1, keepdims=True)
+    cut = n * cutoff // 100
+    lo = np.argmax(hist.cumsum(axis=1) > cut, axis=1)
+    hi = 255 - np.argmax(hist[:, ::-1].cumsum(axis=1) > cut, axis=1)
+
+    values = np.arange(256, dtype=np.float64)
+    span = np.maximum(hi - lo, 1)[:, None]
+    scale = 255.0 / span
+    luts = np.clip((values * scale - lo[:, None] * scale).astype(np.int64), 0, 255)
+    luts[hi <= lo] = np.arange(256)
+
+    # Mean brightness after the autocontrast, as ImageEnhance.Contrast uses it
+    band_means = (hist * luts).sum(axis=1) / np.maximum(n[:, 0], 1)
+    mean = int(np.dot(L_WEIGHTS, band_means) + 0.5)
+
+    lut = mean + np.float32(factor) * (luts - mean).astype(np.float32)
+    return np.clip(lut, 0, 255).astype(np.uint8).ravel().tolist()
+
+
+def adjust_contrast(img, factor, cutoff=1):
+    """
+    Normalizes an RGB image by cutting off the extreme pixels and enhances
+    its contrast by factor, in one pass over the pixels.
+    """
+    return img.point(contrast_lut(img.histogram(), factor, cutoff))
+
+
+def error_card(size):
+    """Placeholder for cards that could not be loaded."""
+    return Image.new("RGB", size, (255, 0, 0))  # Red error card
+
+
+def new_sheet(size):
+    return Image.new("RGB", size)
+
+
+def resize_back(path, size, dest_path):
+    """
+    Saves a resized copy of a back image to dest_path if it doesn't have the
+    expected size. Returns the original size if it was resized, else None.
+    """
+    with Image.open(path) as img:
+        if img.size == size:
+            return None
+
+        # Resize without forcing aspect ratio
+        img.resize(size, Image.Resampling.LANCZOS).save(dest_path)
+        return img.size
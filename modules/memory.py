@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+
+
+def _windows_memory_counters():
+    """Returns the memory counters of this process on Windows, or None."""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(
+        process, ctypes.byref(counters), counters.cb
+    ):
+        return None
+    return counters
+
+
+def peak_rss():
+    """Returns the peak resident memory of this process in bytes, or None."""
+    if sys.platform == "win32":
+        counters = _windows_memory_counters()
+        return counters.PeakWorkingSetSize if counters else None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss():
+    """Returns the resident memory of this process in bytes, or None."""
+    if sys.platform == "win32":
+        counters = _windows_memory_counters()
+        return counters.WorkingSetSize if counters else None
+
+    # Linux only, other systems just report the peak
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class MemoryBudget:
+    """
+    Admits work against a global memory budget, e.g. sheet canvases that are
+    assembled at the same time and the card images that are decoded for them.
+    An item that doesn't fit still runs if no other item of its kind is in
+    flight, so sheets always progress and their decodes can't wait on them.
+    """
+
+    def __init__(self, max_bytes=0):
+        """max_bytes: 0 = unlimited, only track the usage."""
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.in_flight = {}
+        self.peak_used = 0
+        self.peak_in_flight = {}
+        self.condition = threading.Condition()
+
+    def _fits(self, size, kind):
+        return (
+            not self.max_bytes
+            or not self.in_flight.get(kind)
+            or self.used + size <= self.max_bytes
+        )
+
+    def reserve(self, size, kind="sheet"):
+        """
+        Blocks until size bytes fit into the budget and returns a function that
+        releases them again (calling it more than once is harmless).
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self._fits(size, kind))
+            self.used += size
+            self.in_flight[kind] = self.in_flight.get(kind, 0) + 1
+            self.peak_used = max(self.peak_used, self.used)
+            self.peak_in_flight[kind] = max(
+                self.peak_in_flight.get(kind, 0), self.in_flight[kind]
+            )
+
+        released = False
+
+        def release():
+            nonlocal released
+            with self.condition:
+                if released:
+                    return
+                released = True
+                self.used -= size
+                self.in_flight[kind] -= 1
+                self.condition.notify_all()
+
+        return release
@@ -0,0 +1,62 @@
+import math
+
+# Limits of a TTS custom deck sheet
+MAX_COLUMNS = 10
+MAX_ROWS = 7
+MAX_CARDS_PER_SHEET = MAX_COLUMNS * MAX_ROWS
+MAX_SHEET_PIXELS = 10_000
+
+# Rough size of a card scan as WebP, only used for estimates before rendering
+ESTIMATED_BYTES_PER_PIXEL = 0.12
+
+
+def fixed_grid_size(card_count):
+    """Returns (rows, columns) of the classic layout with up to 10 columns."""
+    return math.ceil(card_count / MAX_COLUMNS), min(card_count, MAX_COLUMNS)
+
+
+def optimal_grid_size(card_count, card_size):
+    """
+    Returns the (rows, columns) with the fewest empty slots that fits the
+    TTS limits. Ties go to the squarer sheet, which keeps textures small.
+    """
+    card_w, card_h = card_size
+    best = None
+    for cols in range(1, MAX_COLUMNS + 1):
+        rows = math.ceil(card_count / cols)
+        if (
+            rows > MAX_ROWS
+            or cols * card_w > MAX_SHEET_PIXELS
+            or rows * card_h > MAX_SHEET_PIXELS
+        ):
+            continue
+
+        score = (rows * cols, max(cols * card_w, rows * card_h))
+        if best is None or score < best[0]:
+            best = (score, (rows, cols))
+
+    if best is None:
+        raise ValueError(f"{card_count} cards don't fit on one sheet")
+    return best[1]
+
+
+def summarize(sheets, max_kb):
+    """
+    Returns statistics for planned sheets, given as (card_count, grid_size,
+    card_size) tuples.
+    """
+    cards = slots = pixels = estimated_bytes = 0
+    for card_count, (rows, cols), (card_w, card_h) in sheets:
+        sheet_pixels = rows * cols * card_w * card_h
+        cards += card_count
+        slots += rows * cols
+        pixels += sheet_pixels
+        estimated_bytes += min(sheet_pixels * ESTIMATED_BYTES_PER_PIXEL, max_kb * 1024)
+
+    return {
+        "sheets": len(sheets),
+        "cards": cards,
+        "fill_ratio": cards / slots if slots else 1.0,
+        "pixels": pixels,
+        "estimated_bytes": int(estimated_bytes),
+    }
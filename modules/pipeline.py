@@ -0,0 +1,88 @@
+import queue
+import threading
+import traceback
+
+# Marks the end of the work for one worker of a stage
+_STOP = object()
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages that work in parallel.
+
+    Each stage has its own long-lived worker threads and hands its results to
+    the next stage through a bounded queue, so a slow stage holds back the
+    earlier ones instead of letting finished work pile up in memory.
+    """
+
+    def __init__(self, stages, queue_size=2):
+        """
+        stages: list of (name, function, worker count) tuples.
+        A stage function receives one item and returns the item for the next
+        stage, or None to drop it (e.g. a sheet that is already online).
+        """
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.errors = []
+        self._abort = threading.Event()
+
+    def run(self, items):
+        """Feeds all items through the stages and blocks until they are done."""
+        queues = [queue.Queue(self.queue_size) for _ in self.stages]
+        threads = []
+
+        for index, (name, func, workers) in enumerate(self.stages):
+            in_queue = queues[index]
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+            stage_threads = [
+                threading.Thread(
+                    target=self._work,
+                    args=(name, func, in_queue, out_queue),
+                    name=f"{name}-{i}",
+                    daemon=True,
+                )
+                for i in range(max(1, workers))
+            ]
+            threads.append(stage_threads)
+            for thread in stage_threads:
+                thread.start()
+
+        for item in items:
+            if self._abort.is_set():
+                break
+            queues[0].put(item)
+
+        # Shut down the stages in order, so every stage drains completely
+        for index, stage_threads in enumerate(threads):
+            for _ in stage_threads:
+                queues[index].put(_STOP)
+            for thread in stage_threads:
+                thread.join()
+
+        if self.errors:
+            name, error = self.errors[0]
+            raise RuntimeError(f"Pipeline stage '{name}' failed: {error}") from error
+
+    def _work(self, name, func, in_queue, out_queue):
+        while True:
+            # Don't keep the last item alive while waiting for the next one
+            item = result = None
+            item = in_queue.get()
+            if item is _STOP:
+                return
+
+            # Keep draining after an error, but don't start new work
+            if self._abort.is_set():
+                continue
+
+            try:
+                result = func(item)
+            except Exception as e:
+                # The traceback would keep the item (e.g. a sheet image) alive
+                traceback.clear_frames(e.__traceback__)
+                self.errors.append((name, e))
+                self._abort.set()
+                continue
+
+            if result is not None and out_queue is not None:
+                out_queue.put(result)
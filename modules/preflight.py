@@ -0,0 +1,169 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# Formats that load_card reads without surprises
+SUPPORTED_FORMATS = {"JPEG", "PNG", "WEBP"}
+EXTENSION_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+
+# Modes with transparency turn black where the image is transparent
+ALPHA_MODES = {"RGBA", "LA", "PA", "RGBa", "La"}
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _check_file_end(path, img):
+    """Checks the end of the file for truncation without decoding it."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if img.format == "JPEG":
+            f.seek(max(file_size - 64, 0))
+            # The end of image marker, some encoders add padding after it
+            return b"\xff\xd9" in f.read()
+        if img.format == "WEBP":
+            f.seek(4)
+            riff_size = int.from_bytes(f.read(4), "little")
+            return riff_size + 8 <= file_size
+        if img.format == "PNG":
+            f.seek(max(file_size - 12, 0))
+            return f.read()[4:8] == b"IEND"
+    return True
+
+
+def _check_webp_chunks(path, img):
+    """
+    Walks the RIFF chunks of a WebP without decoding them: every chunk has to
+    fit in the file, and the header of the first frame has to be intact and
+    match the image size.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(4)
+        end = min(int.from_bytes(f.read(4), "little") + 8, file_size)
+        offset = 12
+        while offset + 8 <= end:
+            f.seek(offset)
+            fourcc = f.read(4)
+            size = int.from_bytes(f.read(4), "little")
+            if offset + 8 + size > file_size:
+                raise ValueError(f"WebP chunk {fourcc.decode('latin-1')} is cut off")
+
+            if fourcc == b"VP8 ":
+                # Frame tag (with the size of the first partition) and start code
+                header = f.read(10)
+                first_part_size = int.from_bytes(header[0:3], "little") >> 5
+                if header[3:6] != b"\x9d\x01\x2a" or first_part_size > size - 10:
+                    raise ValueError("broken VP8 frame header")
+                width = int.from_bytes(header[6:8], "little") & 0x3FFF
+                height = int.from_bytes(header[8:10], "little") & 0x3FFF
+                break
+            if fourcc == b"VP8L":
+                header = f.read(5)
+                if header[0:1] != b"\x2f":
+                    raise ValueError("broken VP8L header")
+                bits = int.from_bytes(header[1:5], "little")
+                width, height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                break
+            if fourcc == b"ANMF":
+                # Animated, the canvas size was already read from the VP8X chunk
+                return
+
+            # Chunks are padded to an even size
+            offset += 8 + size + (size & 1)
+        else:
+            raise ValueError("WebP has no image data")
+
+    if (width, height) != img.size:
+        raise ValueError(f"WebP frame is {width}x{height}, header says {img.size}")
+
+
+def _check_first_tile(path, img):
+    """
+    Decodes as little as possible to find corrupt image data: JPEGs are
+    decoded at 1/8 scale, PNGs only have their checksums verified and WebPs
+    only have their chunk structure checked (their decoder can't scale down).
+    """
+    if img.format == "JPEG":
+        img.draft(img.mode, (img.size[0] // 8, img.size[1] // 8))
+        img.load()
+    elif img.format == "WEBP":
+        _check_webp_chunks(path, img)
+    elif img.format == "PNG":
+        # verify() only works on a freshly opened image
+        with Image.open(path) as png:
+            png.verify()
+
+
+def check_image(path, card_sizes):
+    """Returns (info, errors, warnings) for an image file."""
+    errors, warnings = [], []
+    info = {}
+    try:
+        with Image.open(path) as img:
+            info = {"format": img.format, "mode": img.mode, "size": img.size}
+
+            if img.format not in SUPPORTED_FORMATS:
+                warnings.append(f"unusual format {img.format}")
+
+            expected_format = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+            if expected_format and img.format != expected_format:
+                warnings.append(f"{img.format} file with a {expected_format} extension")
+
+            if img.mode in ALPHA_MODES:
+                warnings.append(f"transparency ({img.mode}) turns black")
+            elif img.mode not in ("RGB", "L", "P"):
+                warnings.append(f"unusual mode {img.mode}")
+
+            # load_card ignores the EXIF orientation
+            orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+            if orientation != 1:
+                warnings.append(f"EXIF orientation {orientation} is ignored")
+
+            # Cards are turned upright, so compare the portrait aspect ratio
+            width, height = sorted(img.size)
+            ratio = width / height
+            if not any(
+                abs(ratio - w / h) <= 0.1 * w / h for w, h in card_sizes.values()
+            ):
+                warnings.append(f"unexpected aspect ratio {ratio:.2f}")
+
+            min_height = min(h for _, h in card_sizes.values())
+            if height * 2 < min_height:
+                warnings.append(f"low resolution {img.size[0]}x{img.size[1]}")
+
+            if not _check_file_end(path, img):
+                errors.append("file is truncated")
+            else:
+                _check_first_tile(path, img)
+    except Exception as e:
+        errors.append(f"cannot be read: {e}")
+
+    return info, errors, warnings
+
+
+def check_images(paths, card_sizes, workers=16):
+    """
+    Checks all image files in parallel and returns a report:
+    {"checked", "errors": {path: [...]}, "warnings": {path: [...]},
+    "formats": {format: count}, "modes": {mode: count}}
+    """
+    paths = list(dict.fromkeys(paths))
+    with ThreadPoolExecutor(workers, thread_name_prefix="preflight") as executor:
+        results = list(executor.map(lambda path: check_image(path, card_sizes), paths))
+
+    report = {"checked": len(paths), "errors": {}, "warnings": {}}
+    formats, modes = Counter(), Counter()
+    for path, (info, errors, warnings) in zip(paths, results):
+        if errors:
+            report["errors"][path] = errors
+        if warnings:
+            report["warnings"][path] = warnings
+        if info:
+            formats[info["format"]] += 1
+            modes[info["mode"]] += 1
+
+    report["formats"] = dict(formats)
+    report["modes"] = dict(modes)
+    return report
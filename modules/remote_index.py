@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+
+
+def cloudinary_list_page(folder, cursor=None):
+    """Lists one page of the resources in a Cloudinary folder."""
+    # Late import, cloudinary is only needed when uploading
+    import cloudinary
+
+    search = cloudinary.Search().expression(f'folder="{folder}"').max_results(500)
+    if cursor:
+        search = search.next_cursor(cursor)
+    res = search.execute()
+    return res.get("resources", []), res.get("next_cursor")
+
+
+class RemoteIndex:
+    """
+    Local name -> URL index of everything that is already uploaded.
+
+    The index is built from one paginated listing of the upload folder and
+    persisted as a JSON manifest, so existence checks are dictionary lookups
+    instead of one API request per file.
+    """
+
+    def __init__(self, path, folder, list_page=cloudinary_list_page):
+        """
+        list_page(folder, cursor) returns a tuple of (resources, next cursor),
+        where every resource has a "public_id" and a "secure_url".
+        """
+        self.path = path
+        self.folder = folder
+        self.list_page = list_page
+        self.lock = threading.Lock()
+        self.urls = {}
+        self.updated = 0
+
+    def load(self, max_age=0):
+        """
+        Fills the index, reusing the manifest if it is younger than max_age
+        seconds. Falls back to the manifest if the listing fails.
+        """
+        manifest = self._read_manifest()
+        if manifest and max_age > 0 and time.time() - manifest["updated"] < max_age:
+            self.urls = manifest["urls"]
+            self.updated = manifest["updated"]
+            print(f"[INFO]     Using remote manifest ({len(self.urls)} files)")
+            return
+
+        try:
+            self.refresh()
+        except Exception as e:
+            if not manifest:
+                raise
+            print(f"[WARNING] Listing {self.folder} failed, using manifest: {e}")
+            self.urls = manifest["urls"]
+            self.updated = manifest["updated"]
+
+    def refresh(self):
+        """Rebuilds the index from a full listing of the folder."""
+        urls = {}
+        cursor = None
+        while True:
+            resources, cursor = self.list_page(self.folder, cursor)
+            for res in resources:
+                # Public IDs may contain the folder
+                name = res["public_id"].rsplit("/", 1)[-1]
+                urls[name] = res["secure_url"]
+            if not cursor:
+                break
+
+        with self.lock:
+            self.urls = urls
+            self.updated = time.time()
+            self._write_manifest()
+        print(f"[INFO]     Found {len(urls)} files in {self.folder}")
+
+    def get(self, name):
+        return self.urls.get(name)
+
+    def add(self, name, url):
+        """Records a finished upload."""
+        with self.lock:
+            self.urls[name] = url
+            self._write_manifest()
+
+    def _read_manifest(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading remote manifest: {e}")
+            return None
+        if manifest.get("folder") != self.folder:
+            return None
+        return manifest
+
+    def _write_manifest(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"folder": self.folder, "updated": self.updated, "urls": self.urls},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
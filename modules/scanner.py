@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def is_image(file_name):
+    return file_name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _list_dir(path):
+    """Returns the image file names and the subfolders of a folder."""
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        # Like os.walk, linked folders are not followed
+                        if not entry.is_symlink():
+                            dirs.append(entry.path)
+                    elif is_image(entry.name):
+                        files.append(entry.name)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return files, dirs
+
+
+def scan_tree(source_folder, categories, workers=16):
+    """
+    Lists the image files below the category folders of source_folder and
+    returns (category, cycle folder name or None, folder, file names) per
+    folder, in the same order as os.walk.
+
+    Only the category folders are entered, and all folders of one depth are
+    listed in parallel, which helps most on network shares.
+    """
+    top_dirs = [
+        path
+        for path in _list_dir(source_folder)[1]
+        if os.path.basename(path) in categories
+    ]
+
+    listings = {}
+    with ThreadPoolExecutor(workers, thread_name_prefix="scan") as executor:
+        level = top_dirs
+        while level:
+            next_level = []
+            for path, listing in zip(level, executor.map(_list_dir, level)):
+                listings[path] = listing
+                next_level += listing[1]
+            level = next_level
+
+    # Return the folders top-down in listing order, as os.walk would
+    result = []
+    for top_dir in top_dirs:
+        category = os.path.basename(top_dir)
+        stack = [(top_dir, None)]
+        while stack:
+            path, cycle_name = stack.pop()
+            files, dirs = listings[path]
+            result.append((category, cycle_name, path, files))
+            stack += [
+                (sub_dir, cycle_name or os.path.basename(sub_dir))
+                for sub_dir in reversed(dirs)
+            ]
+    return result
+
+
+def read_file_list(path, source_folder, categories):
+    """
+    Reads the image files from a list instead of scanning the source folder
+    and returns them like scan_tree. The list is either a text file with one
+    path per line (relative to the source folder) or a build manifest.
+    """
+    if path.endswith(".manifest"):
+        # Late import, the manifest is only needed for this input
+        from modules.build_manifest import BuildManifest
+
+        manifest = BuildManifest(path)
+        if not manifest.load() or not manifest.files:
+            raise ValueError(f"No file list in build manifest: {path}")
+        lines = manifest.files
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    # Each folder is only parsed once
+    folders = {}
+    for line in lines:
+        if os.altsep:
+            line = line.replace(os.altsep, os.sep)
+        rel_folder, _, file_name = line.strip().rpartition(os.sep)
+        if not is_image(file_name):
+            continue
+
+        if rel_folder not in folders:
+            parts = os.path.normpath(rel_folder).split(os.sep)
+            if parts[0] in categories:
+                folder = os.path.join(source_folder, *parts)
+                cycle_name = parts[1] if len(parts) > 1 else None
+                folders[rel_folder] = (parts[0], cycle_name, folder, [])
+            else:
+                folders[rel_folder] = None
+
+        if folders[rel_folder]:
+            folders[rel_folder][3].append(file_name)
+
+    return [folder for folder in folders.values() if folder]
@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+
+# Settings are stored next to main.py
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json"
+)
+
+
+def generate_default_output_path():
+    """Returns the 'Saved Objects' folder of TTS."""
+    if sys.platform == "darwin":  # macOS
+        base_folder = os.path.join(
+            os.path.expanduser("~"),
+            "Library",
+        )
+    elif sys.platform == "linux":  # linux
+        base_folder = os.path.join(os.path.expanduser("~"), ".local", "share")
+    else:  # windows
+        base_folder = os.path.join(
+            os.environ["USERPROFILE"],
+            "Documents",
+            "My Games",
+        )
+    return os.path.join(
+        f"{base_folder}",
+        "Tabletop Simulator",
+        "Saves",
+        "Saved Objects",
+    ).replace("\\", "/")
+
+
+DEFAULTS = {
+    "img_max_kb": 20_480,
+    "cloud_name": "-",
+    "api_key": "-",
+    "api_secret": "-",
+    "locale": "en",
+    "max_sheet_count": 999,
+    "output_folder": generate_default_output_path(),
+    "source_folder": "",
+    "upload": False,
+    "img_count_per_sheet": 30,
+    "img_quality": 90,
+    "img_contrast": 100,
+    # Card resizing: "fast", "balanced" (decodes large JPEGs at reduced size) or "best"
+    "resize_quality": "balanced",
+    # Worker counts per processing stage (0 = pick automatically)
+    "scan_workers": 0,
+    "decode_workers": 0,
+    "assemble_workers": 0,
+    "encode_workers": 0,
+    "upload_workers": 0,
+    "pipeline_queue_size": 2,
+    # Sheets that are assembled and encoded and the card images that are decoded
+    # at the same time must fit into this
+    "memory_budget_mb": 2048,
+    "upload_retries": 5,
+    # Where uploads go: "cloudinary", or "local" (a folder that "main.py serve"
+    # makes available at local_store_url, empty folder = "store" in the cache folder)
+    "storage": "cloudinary",
+    "local_store_folder": "",
+    "local_store_url": "http://127.0.0.1:8642",
+    # Parallel encodes per round of the sheet quality search
+    "encode_search_width": 1,
+    "encode_predict_size": True,
+    # Working folders (empty = "temp" and "cache" next to main.py)
+    "temp_folder": "",
+    "cache_folder": "",
+    # Write the bag without indentation (about half the size)
+    "compact_json": False,
+    # Also write parts of the bag as saved objects of their own, into the
+    # "TranslationBag - <LOCALE>" folder: "category", "cycle", "both" or ""
+    "shard_output": "",
+    # Record the time, CPU and bytes of every stage into this file (and a
+    # Chrome trace next to it, <name>.chrome.json)
+    "trace_file": "",
+    # Size limits of the caches between runs (0 = disabled)
+    "sheet_cache_mb": 2048,
+    "card_cache_mb": 4096,
+    "cache_hash_content": False,
+    # Source of the card data
+    "api_url": "https://api.arkham.build/v1/cache/cards",
+    # Read the source files from this list (one path per line, or the .manifest
+    # of an earlier build) instead of scanning the source folder
+    "source_file_list": "",
+    # Check all source images before building and stop if any can't be read
+    "preflight": True,
+    "fail_on_bad_images": True,
+    # Only rebuild sheets that changed since the last build (see the .manifest file)
+    "incremental": True,
+    # Keep cards on the sheet they were on in the last build
+    "stable_sheets": True,
+    # Pick grid shapes with the fewest empty slots and merge cycles with the same back
+    "optimize_sheets": False,
+    # Build from the cached card data without network access
+    "offline": False,
+    # Use cached card data without revalidating if it is younger
+    "api_cache_max_age_min": 0,
+    # Reuse the list of uploaded files if it is younger (0 = always refresh)
+    "remote_index_max_age_min": 0,
+}
+
+
+def read_config_file(path=CONFIG_PATH):
+    """Returns only the values saved in a config file ({} if there is none)."""
+    # Attempt to read the file if it actually exists
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading config file, using defaults: {e}")
+    return {}
+
+
+def load_config(path=CONFIG_PATH):
+    """Returns the default settings updated with the values from a config file."""
+    return {**DEFAULTS, **read_config_file(path)}
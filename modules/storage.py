@@ -0,0 +1,249 @@
+import hashlib
+import http.server
+import io
+import json
+import os
+import shutil
+import threading
+from functools import partial
+from urllib.parse import urlsplit
+
+
+class Storage:
+    """
+    Where sheets and backs are stored, so TTS can load them from a URL.
+
+    Backends implement url() and put_one(). exists() and put() work on batches
+    and can be replaced by backends that support real batch requests.
+    """
+
+    def load(self, max_age=0):
+        """Prepares the existence checks (e.g. lists what is already stored)."""
+
+    def url(self, name):
+        """Returns the URL of a stored file, or None if it isn't stored."""
+        raise NotImplementedError
+
+    def exists(self, names):
+        """Returns a name -> URL dictionary of the names that are stored."""
+        urls = {}
+        for name in names:
+            url = self.url(name)
+            if url:
+                urls[name] = url
+        return urls
+
+    def put_one(self, name, source):
+        """Stores source (bytes or a file path) under name and returns its URL."""
+        raise NotImplementedError
+
+    def put(self, items):
+        """Stores (name, bytes or file path) items and returns name -> URL."""
+        return {name: self.put_one(name, source) for name, source in items}
+
+    def is_retryable(self, e):
+        """Whether a failed put_one is worth retrying."""
+        return True
+
+    def is_rate_limited(self, e):
+        return False
+
+
+def _read(source):
+    if isinstance(source, bytes):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def _extension(source, default=".webp"):
+    if isinstance(source, bytes):
+        return default
+    return os.path.splitext(source)[1] or default
+
+
+class TempFolderStorage(Storage):
+    """Keeps files in the temp folder and links them with file:/// URLs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.abs_path = os.path.abspath(path)
+
+    def _file(self, name):
+        if not os.path.isdir(self.path):
+            return None
+        return next(
+            (
+                entry.path
+                for entry in os.scandir(self.path)
+                if os.path.splitext(entry.name)[0] == name
+            ),
+            None,
+        )
+
+    def url(self, name):
+        path = self._file(name)
+        return "file:///" + path if path else None
+
+    def put_one(self, name, source):
+        # Files that are already in the temp folder stay where they are
+        if isinstance(source, str) and (
+            os.path.dirname(os.path.abspath(source)) == self.abs_path
+        ):
+            return "file:///" + source
+
+        path = os.path.join(self.path, name + _extension(source))
+        if isinstance(source, bytes):
+            with open(path, "wb") as f:
+                f.write(source)
+        elif not (os.path.exists(path) and os.path.samefile(source, path)):
+            shutil.copy2(source, path)
+        return "file:///" + path
+
+
+class CloudinaryStorage(Storage):
+    """
+    Uploads to a Cloudinary folder. Existence checks are lookups in the
+    RemoteIndex, which lists the folder once.
+    """
+
+    def __init__(self, cfg, remote_index, connections=4):
+        # Late import, cloudinary is only needed when uploading
+        import cloudinary
+        import cloudinary.uploader
+        import cloudinary.utils
+
+        cloudinary.config(
+            cloud_name=cfg["cloud_name"],
+            api_key=cfg["api_key"],
+            api_secret=cfg["api_secret"],
+        )
+
+        # Size the connection pool so every upload worker keeps its connection alive.
+        # cloudinary has no public option for this: in 1.x every upload goes
+        # through the module-level uploader._http, so only that version gets
+        # the bigger pool and others keep their default one.
+        if cloudinary.VERSION.split(".")[0] == "1" and hasattr(
+            cloudinary.uploader, "_http"
+        ):
+            cloudinary.uploader._http = cloudinary.utils.get_http_connector(
+                cloudinary.config(), {**cloudinary.CERT_KWARGS, "maxsize": connections}
+            )
+
+        self.remote_index = remote_index
+
+    def load(self, max_age=0):
+        self.remote_index.load(max_age)
+
+    def url(self, name):
+        return self.remote_index.get(name)
+
+    def put_one(self, name, source):
+        import cloudinary.uploader
+
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        res = cloudinary.uploader.upload(
+            source, public_id=name, folder=self.remote_index.folder
+        )
+        url = res.get("secure_url")
+        if url:
+            self.remote_index.add(name, url)
+        return url
+
+    def is_retryable(self, e):
+        """Errors caused by the request itself won't go away by retrying."""
+        import cloudinary.exceptions
+
+        return not isinstance(
+            e,
+            (
+                cloudinary.exceptions.AuthorizationRequired,
+                cloudinary.exceptions.BadRequest,
+                cloudinary.exceptions.NotAllowed,
+                cloudinary.exceptions.NotFound,
+            ),
+        )
+
+    def is_rate_limited(self, e):
+        import cloudinary.exceptions
+
+        return isinstance(e, cloudinary.exceptions.RateLimited)
+
+
+class LocalStore(Storage):
+    """
+    Content-addressed folder: every file is stored once under the hash of its
+    content in "objects", and "index.json" maps names to it. serve() makes the
+    objects available to TTS on this machine or in the LAN at base_url.
+    """
+
+    def __init__(self, path, base_url="http://127.0.0.1:8642"):
+        self.path = path
+        self.objects_path = os.path.join(path, "objects")
+        self.index_path = os.path.join(path, "index.json")
+        self.base_url = base_url.rstrip("/")
+        self.lock = threading.Lock()
+        self.objects = {}
+
+    def load(self, max_age=0):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.objects = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading store index: {e}")
+
+    def url(self, name):
+        obj = self.objects.get(name)
+        if not obj or not os.path.exists(os.path.join(self.objects_path, obj)):
+            return None
+        return f"{self.base_url}/{obj}"
+
+    def put_one(self, name, source):
+        data = _read(source)
+        obj = hashlib.sha256(data).hexdigest() + _extension(source)
+
+        # Identical content is only stored once
+        path = os.path.join(self.objects_path, obj)
+        if not os.path.exists(path):
+            os.makedirs(self.objects_path, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self.lock:
+            self.objects[name] = obj
+            self._write_index()
+        return f"{self.base_url}/{obj}"
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.objects, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+
+class _ObjectHandler(http.server.SimpleHTTPRequestHandler):
+    def end_headers(self):
+        # Objects never change, their name is the hash of their content
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(store, host=None, port=None):
+    """
+    Returns an HTTP server for the objects of a LocalStore, by default on
+    the host and port of its base_url. Call serve_forever() to run it.
+    """
+    address = urlsplit(store.base_url)
+    os.makedirs(store.objects_path, exist_ok=True)
+    handler = partial(_ObjectHandler, directory=store.objects_path)
+    return http.server.ThreadingHTTPServer(
+        (host or address.hostname, port or address.port or 80), handler
+    )
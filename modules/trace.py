@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+
+from modules.memory import current_rss, peak_rss
+
+
+class Span:
+    """
+    Times one piece of work as a context manager. Set span.bytes to the bytes
+    it read or wrote.
+    """
+
+    __slots__ = ("tracer", "name", "category", "args", "bytes", "start", "cpu_start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.bytes = 0
+
+    def __enter__(self):
+        self.cpu_start = self.tracer.cpu_clock(self.category)()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        cpu = self.tracer.cpu_clock(self.category)() - self.cpu_start
+        self.tracer.record(self, end, cpu)
+        return False
+
+
+class _NullSpan:
+    """Stands in for a span while tracing is off, so it costs next to nothing."""
+
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """The tracer that is used while tracing is off."""
+
+    enabled = False
+
+    def span(self, name, category, **args):
+        return _NULL_SPAN
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    """
+    Records the wall time, CPU time and bytes of the stages of a build, e.g.
+    the decode of a card or an encode attempt of a sheet, and samples the
+    memory use of the process in the background.
+
+    Spans of the "step" category measure the CPU time of the whole process
+    (the work of a step runs in other threads), all others that of their thread.
+    """
+
+    enabled = True
+
+    def __init__(self, sample_interval=0.1):
+        self.sample_interval = sample_interval
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.rss_samples = []
+        self.thread_names = {}
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def span(self, name, category, **args):
+        """Returns a context manager that records one span (args: e.g. sheet=)."""
+        return Span(self, name, category, args)
+
+    @staticmethod
+    def cpu_clock(category):
+        return time.process_time if category == "step" else time.thread_time
+
+    def record(self, span, end, cpu):
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        self.spans.append(
+            (
+                span.name,
+                span.category,
+                span.start - self.origin,
+                end - span.start,
+                cpu,
+                span.bytes,
+                thread.ident,
+                span.args,
+            )
+        )
+
+    def start(self):
+        """Starts sampling the memory use."""
+        if self._sampler:
+            return
+        self._sampler = threading.Thread(
+            target=self._sample, name="trace-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self):
+        if self._sampler:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+            self._stopped.clear()
+
+    def _sample(self):
+        while True:
+            rss = current_rss() or peak_rss()
+            if rss:
+                self.rss_samples.append((time.perf_counter() - self.origin, rss))
+            if self._stopped.wait(self.sample_interval):
+                return
+
+    def summary(self):
+        """Returns the totals per stage and per sheet, and every span."""
+        stages = {}
+        sheets = {}
+        for name, category, start, wall, cpu, size, _, args in self.spans:
+            stage = stages.setdefault(
+                name,
+                {
+                    "category": category,
+                    "count": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "bytes": 0,
+                    "max_wall": 0.0,
+                },
+            )
+            stage["count"] += 1
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+            stage["bytes"] += size
+            stage["max_wall"] = max(stage["max_wall"], wall)
+
+            if "sheet" in args:
+                sheet = sheets.setdefault(args["sheet"], {})
+                sheet[name] = sheet.get(name, 0.0) + wall
+
+        return {
+            "wall": time.perf_counter() - self.origin,
+            "peak_rss": peak_rss(),
+            "stages": stages,
+            "sheets": sheets,
+            "spans": [
+                {
+                    "name": name,
+                    "category": category,
+                    "start": start,
+                    "wall": wall,
+                    "cpu": cpu,
+                    "bytes": size,
+                    "thread": self.thread_names.get(thread, str(thread)),
+                    **args,
+                }
+                for name, category, start, wall, cpu, size, thread, args in self.spans
+            ],
+            "rss_samples": self.rss_samples,
+        }
+
+    def chrome_trace(self):
+        """Returns the spans as trace events for chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": thread,
+                "args": {"name": name},
+            }
+            for thread, name in self.thread_names.items()
+        ]
+        for name, category, start, wall, cpu, size, thread, args in self.spans:
+            events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": wall * 1e6,
+                    "pid": pid,
+                    "tid": thread,
+                    "args": {"cpu_ms": cpu * 1000, "bytes": size, **args},
+                }
+            )
+        for start, rss in self.rss_samples:
+            events.append(
+                {
+                    "name": "memory",
+                    "ph": "C",
+                    "ts": start * 1e6,
+                    "pid": pid,
+                    "args": {"rss_mb": rss / 1024**2},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        """
+        Writes the summary to path and the trace events next to it
+        (<name>.chrome.json). Returns the path of the trace events.
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        chrome_path = os.path.splitext(path)[0] + ".chrome.json"
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(chrome_path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return chrome_path
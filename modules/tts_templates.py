@@ -24,3 +24,13 @@ CARD = {
     "Transform": {"rotY": 270, "scaleX": 1, "scaleY": 1, "scaleZ": 1},
     "HideWhenFaceDown": True,
 }
+
+
+def new_bag(**fields):
+    """Returns a new bag with fields, much cheaper than a deep copy of BAG."""
+    return {**BAG, "Transform": {**BAG["Transform"]}, **fields}
+
+
+def new_card(**fields):
+    """Returns a new card with fields, much cheaper than a deep copy of CARD."""
+    return {**CARD, "Transform": {**CARD["Transform"]}, **fields}
@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Uploader:
+    """
+    Runs uploads in parallel and retries failed ones with exponential backoff.
+
+    Every upload returns a future, and an optional callback is run with the
+    URL as soon as that upload is done. A rate-limit error pauses all workers,
+    not just the one that hit it.
+    """
+
+    def __init__(
+        self,
+        upload_func,
+        workers=4,
+        retries=5,
+        backoff=1.0,
+        max_backoff=60.0,
+        is_retryable=lambda e: True,
+        is_rate_limited=lambda e: False,
+    ):
+        """upload_func(name, path) uploads a single file and returns its URL."""
+        self.upload_func = upload_func
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.is_retryable = is_retryable
+        self.is_rate_limited = is_rate_limited
+
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="upload")
+
+        # Limits queued uploads, so callers block instead of piling up work
+        self.slots = threading.BoundedSemaphore(workers * 2)
+
+        self.lock = threading.Lock()
+        # Notified whenever an upload is done
+        self.idle = threading.Condition(self.lock)
+        self.paused_until = 0.0
+        self.pending = set()
+        self.failed = {}
+
+    def submit(self, name, path, callback=None, upload_func=None):
+        """
+        Queues an upload and returns a future for its URL.
+        upload_func replaces the default upload function for this file.
+        """
+        self.slots.acquire()
+        future = self.executor.submit(
+            self._upload, name, path, upload_func or self.upload_func
+        )
+
+        with self.lock:
+            self.pending.add(future)
+
+        def done(f):
+            try:
+                if f.exception():
+                    with self.lock:
+                        self.failed[name] = f.exception()
+                    print(f"[ERROR]   Upload of {name} failed: {f.exception()}")
+                elif callback:
+                    callback(f.result())
+            except Exception as e:
+                with self.lock:
+                    self.failed[name] = e
+                print(f"[ERROR]   Recording the upload of {name} failed: {e}")
+            finally:
+                # Only count as done once the callback ran, so wait() covers it
+                with self.idle:
+                    self.pending.discard(f)
+                    self.idle.notify_all()
+                self.slots.release()
+
+        future.add_done_callback(done)
+        return future
+
+    def upload(self, name, path, upload_func=None):
+        """Uploads a file and blocks until it is done."""
+        return self.submit(name, path, upload_func=upload_func).result()
+
+    def wait(self):
+        """Blocks until all queued uploads are done."""
+        with self.idle:
+            self.idle.wait_for(lambda: not self.pending)
+
+    def shutdown(self):
+        """Stops the worker threads once queued uploads are done."""
+        self.executor.shutdown()
+
+    def _upload(self, name, path, upload_func):
+        attempt = 0
+        while True:
+            self._wait_for_rate_limit()
+            try:
+                return upload_func(name, path)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries or not self.is_retryable(e):
+                    raise
+
+                # Full jitter keeps parallel retries from hitting the server at once
+                delay = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2**attempt)
+                )
+                if self.is_rate_limited(e):
+                    delay = max(delay, min(self.max_backoff, self.backoff * 2**attempt))
+                    with self.lock:
+                        self.paused_until = max(self.paused_until, time.time() + delay)
+                    print(f"[RETRY]    {name} rate limited, pausing uploads")
+                else:
+                    print(f"[RETRY]    {name} ({attempt}/{self.retries}): {e}")
+                    time.sleep(delay)
+
+    def _wait_for_rate_limit(self):
+        while True:
+            with self.lock:
+                delay = self.paused_until - time.time()
+            if delay <= 0:
+                return
+            time.sleep(delay)
@@ -0,0 +1,116 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import TTSBundleProcessor
+from modules.build_manifest import BuildManifest
+from modules.settings import DEFAULTS
+
+
+def make_processor(tmp, double_sided, card_count=6, **settings):
+    """A processor with cards 01001-010xx of one cycle, indexed like scan_source does."""
+    proc = TTSBundleProcessor(
+        {
+            **DEFAULTS,
+            "locale": "de",
+            "upload": False,
+            "output_folder": tmp,
+            "temp_folder": os.path.join(tmp, "temp"),
+            "cache_folder": os.path.join(tmp, "cache"),
+            **settings,
+        }
+    )
+    for n in range(1, card_count + 1):
+        arkham_id = f"010{n:02}"
+        entry = {
+            "cycle_name": "01 - Core",
+            "file_path": f"{arkham_id}.webp",
+            "double_sided": arkham_id in double_sided,
+            "category": "PlayerCards",
+        }
+        proc.card_index[arkham_id] = entry
+        if arkham_id in double_sided:
+            proc.card_index[f"{arkham_id}{proc.BACK_SUFFIX}"] = {
+                **entry,
+                "file_path": f"{arkham_id}-back.webp",
+            }
+    return proc
+
+
+def previous_build(proc):
+    """Returns the manifest that a finished build of proc would have saved."""
+    proc.organize_sheets()
+    manifest = BuildManifest(os.path.join(proc.cfg["output_folder"], "x.manifest"))
+    manifest.sheets = {
+        online_name: {"content_key": "-", "url": "-", "id_list": data["id_list"]}
+        for online_name, data in proc.get_sheet_jobs()
+    }
+    return manifest
+
+
+class OrganizeSheetsTest(unittest.TestCase):
+    def assert_backs_match_fronts(self, proc):
+        sheets = proc.sheet_parameters.values()
+        fronts = [data for data in sheets if data["sheet_type"] == "front"]
+        backs = [data for data in sheets if data["sheet_type"] == "back"]
+        self.assertEqual(len(fronts), len(backs))
+        for front, back in zip(fronts, backs):
+            self.assertEqual(
+                back["id_list"],
+                [f"{arkham_id}{proc.BACK_SUFFIX}" for arkham_id in front["id_list"]],
+            )
+            self.assertEqual(back["grid_size"], front["grid_size"])
+
+        # Every card sits at the same position as its back
+        for arkham_id, data in proc.card_index.items():
+            back = proc.card_index.get(f"{arkham_id}{proc.BACK_SUFFIX}")
+            if back:
+                self.assertEqual(back["card_id"], data["card_id"])
+
+    def test_card_gains_a_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            before = {"01001", "01002", "01004", "01005", "01006"}
+            manifest = previous_build(make_processor(tmp, before))
+
+            proc = make_processor(tmp, before | {"01003"})
+            proc.build_manifest = manifest
+            proc.organize_sheets()
+
+            self.assert_backs_match_fronts(proc)
+
+    def test_back_sheet_missing_from_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            double_sided = {"01001", "01002", "01003", "01004"}
+            manifest = previous_build(make_processor(tmp, double_sided))
+
+            # e.g. the upload of the back sheet failed
+            manifest.sheets = {
+                online_name: sheet
+                for online_name, sheet in manifest.sheets.items()
+                if not sheet["id_list"][0].endswith("-back")
+            }
+            proc = make_processor(tmp, double_sided | {"01005"})
+            proc.build_manifest = manifest
+            proc.organize_sheets()
+
+            self.assert_backs_match_fronts(proc)
+
+    def test_optimized_sheets_are_balanced(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = make_processor(tmp, set(), 31, optimize_sheets=True)
+            proc.organize_sheets()
+
+            counts = [len(data["id_list"]) for data in proc.sheet_parameters.values()]
+            self.assertCountEqual(counts, [16, 15])
+
+    def test_count_per_sheet_is_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                make_processor(tmp, set(), img_count_per_sheet=71)
+
+
+if __name__ == "__main__":
+    unittest.main()